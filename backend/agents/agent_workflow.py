@@ -1,8 +1,9 @@
+import json
 from typing import TypedDict, List
-from langgraph.graph import StateGraph
-from .planner_agent import planner, generate_plan
-from .executor_agent import executor
-from .reflector_agent import reflector, vector_db
+from backend.tracing import profiling, span, traced
+from .registry import get
+from .planner_agent import generate_plan
+from .reflector_agent import reflect_on
 
 class WorkflowState(TypedDict):
     goals: List[str]
@@ -11,12 +12,37 @@ class WorkflowState(TypedDict):
     results: dict
     insights: dict
 
+@traced("node.planner")
+def plan(state: WorkflowState) -> dict:
+    return {"plan": generate_plan(state)}
+
+@traced("node.executor")
+def execute(state: WorkflowState) -> dict:
+    from .plan_compiler import compile_plan  # pulls in pandas and the tools, so not at import time
+    # Structured goals and allocations run straight through the tools; the LLM only sees the rest
+    results, leftover = compile_plan(state["plan"], state.get("profile"))
+    if leftover is not None:
+        with span("llm.executor", leftover=sorted(leftover)):
+            # The executor prompt takes a single {input} variable
+            results["executor"] = get("executor").invoke({"input": json.dumps(leftover, default=str)})
+    return {"results": results}
+
+@traced("node.reflector")
+def reflect(state: WorkflowState) -> dict:
+    user_id = (state.get("profile") or {}).get("user_id", "default")
+    insights = reflect_on(state["results"], user_id=user_id)
+    # Queued for the background writer so the run never waits on the vector store
+    text = insights if isinstance(insights, str) else json.dumps(insights, default=str)
+    get("user_memory").remember(user_id, text, {"type": "insights", "goals": json.dumps(state.get("goals", []))})
+    return {"insights": insights}
+
 def create_workflow():
+    from langgraph.graph import StateGraph, END
     workflow = StateGraph(WorkflowState)
     
-    workflow.add_node("planner", lambda state: {"plan": generate_plan(state)})
-    workflow.add_node("executor", lambda state: {"results": executor.invoke(state["plan"])})
-    workflow.add_node("reflector", lambda state: {"insights": reflector.invoke(state["results"])})
+    workflow.add_node("planner", plan)
+    workflow.add_node("executor", execute)
+    workflow.add_node("reflector", reflect)
     
     workflow.set_entry_point("planner")
     workflow.add_edge("planner", "executor")
@@ -25,4 +51,16 @@ def create_workflow():
     
     return workflow.compile()
 
-financial_workflow = create_workflow()
\ No newline at end of file
+def run_workflow(state: WorkflowState, profile: bool = False) -> dict:
+    """Invoke the workflow as one trace; ``profile=True`` also samples stacks for this run"""
+    with span("workflow", user_id=(state.get("profile") or {}).get("user_id")):
+        if not profile:
+            return get("financial_workflow").invoke(state)
+        with profiling():
+            return get("financial_workflow").invoke(state)
+
+def __getattr__(name):
+    # Compiled on first access instead of at import
+    if name == "financial_workflow":
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
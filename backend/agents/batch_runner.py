@@ -0,0 +1,116 @@
+"""
+Run the planner -> executor -> reflector workflow for many users at once.
+
+Each user moves through the three nodes on their own, so while one user
+waits on the reflector another is already being planned, and every model
+keeps a full queue. Calls to each model are capped by a per-model
+semaphore, inputs are only pulled as fast as users finish (at most
+``max_pending`` in flight), and results are yielded in completion order.
+A failing user is reported with its error and does not stop the batch.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Union
+
+from backend.tracing import span
+from .agent_workflow import WorkflowState, execute, plan, reflect
+from .executor_agent import EXECUTOR_MODEL
+from .planner_agent import PLANNER_MODEL
+from .reflector_agent import REFLECTOR_MODEL
+
+STAGES = (
+    ("planner", PLANNER_MODEL, plan),
+    ("executor", EXECUTOR_MODEL, execute),
+    ("reflector", REFLECTOR_MODEL, reflect),
+)
+
+class BatchRunner:
+    def __init__(self, concurrency: Dict[str, int] = None, max_pending: int = 64):
+        # Concurrent requests allowed per model name
+        self.concurrency = {model: 2 for _, model, _ in STAGES}
+        self.concurrency.update(concurrency or {})
+        self.max_pending = max_pending
+
+    async def _run_one(self, index: int, state: WorkflowState, semaphores, pool) -> dict:
+        loop = asyncio.get_running_loop()
+        state = dict(state)
+        started = time.perf_counter()
+        stage = None
+        try:
+            with span("workflow", user_id=(state.get("profile") or {}).get("user_id")):
+                for stage, model, node in STAGES:
+                    async with semaphores[model]:
+                        # Run the node in this task's context so its spans join the user's trace
+                        call = functools.partial(contextvars.copy_context().run, node, state)
+                        state.update(await loop.run_in_executor(pool, call))
+            return {"index": index, "state": state, "error": None, "seconds": time.perf_counter() - started}
+        except Exception as error:
+            return {
+                "index": index,
+                "state": state,
+                "error": f"{stage}: {type(error).__name__}: {error}",
+                "seconds": time.perf_counter() - started
+            }
+
+    async def run(self, states: Union[Iterable[WorkflowState], AsyncIterator[WorkflowState]]) -> AsyncIterator[dict]:
+        """
+        Yield one result per input state as each user finishes.
+
+        Results are dicts with the input ``index``, the final ``state``, the
+        ``error`` (None on success, else the failing node and exception) and
+        the ``seconds`` the user took.
+        """
+        semaphores = {model: asyncio.Semaphore(limit) for model, limit in self.concurrency.items()}
+        inbox = asyncio.Queue(self.max_pending)
+        outbox = asyncio.Queue(self.max_pending)
+        workers = self.max_pending
+        # One thread per request the models may be serving at once
+        pool = ThreadPoolExecutor(max_workers=sum(self.concurrency.values()), thread_name_prefix="workflow")
+
+        async def feed():
+            index = 0
+            try:
+                if hasattr(states, "__aiter__"):
+                    async for state in states:
+                        await inbox.put((index, state))
+                        index += 1
+                else:
+                    for state in states:
+                        await inbox.put((index, state))
+                        index += 1
+            finally:
+                for _ in range(workers):
+                    await inbox.put(None)
+
+        async def work():
+            while True:
+                item = await inbox.get()
+                if item is None:
+                    break
+                await outbox.put(await self._run_one(*item, semaphores, pool))
+            await outbox.put(None)
+
+        tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(workers)]
+        try:
+            finished = 0
+            while finished < workers:
+                result = await outbox.get()
+                if result is None:
+                    finished += 1
+                    continue
+                yield result
+            await tasks[0]  # surface errors from iterating the inputs
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def run_batch(states: Iterable[WorkflowState], **kwargs) -> List[dict]:
+    """Blocking convenience wrapper: every result, in input order"""
+    async def collect():
+        return [result async for result in BatchRunner(**kwargs).run(states)]
+    return sorted(asyncio.run(collect()), key=lambda result: result["index"])
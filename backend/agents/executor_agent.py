@@ -1,30 +1,60 @@
 from langchain_core.tools import tool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_community.llms import Ollama
-from typing import Annotated
+from typing import Annotated, List
+from backend.tools.sip_calculator import SIPCalculator, project_sip
+from backend.tracing import traced
+from .registry import get, ollama
+
+EXECUTOR_MODEL = "llama3"
 
 @tool
+@traced("tool.calculate_sip")
 def calculate_sip(
     principal: Annotated[float, "Monthly investment"],
     years: Annotated[int, "Duration"],
     rate: Annotated[float, "Expected return %"]
 ) -> dict:
     """Calculate SIP returns using compound interest"""
-    months = years * 12
-    monthly_rate = rate / 12 / 100
-    future_value = principal * (((1 + monthly_rate)**months - 1) / monthly_rate)
+    projection = project_sip(principal, years, rate / 100)
     return {
-        "total_invested": principal * months,
-        "estimated_value": future_value
+        "total_invested": float(projection["total_invested"]),
+        "estimated_value": float(projection["future_value"])
     }
 
+@tool
+@traced("tool.calculate_sip_scenarios", size=len)
+def calculate_sip_scenarios(
+    principals: Annotated[List[float], "Monthly investments to compare"],
+    years: Annotated[List[int], "Durations to compare"],
+    rates: Annotated[List[float], "Expected returns % to compare"],
+    step_up: Annotated[float, "Annual increase of the monthly investment %"] = 0.0
+) -> List[dict]:
+    """Calculate SIP returns for every combination of investments, durations and rates"""
+    frame = SIPCalculator().project_grid(
+        principals, years, rates=[rate / 100 for rate in rates], step_ups=[step_up / 100]
+    )
+    return [
+        {
+            "principal": row.amount,
+            "years": int(row.years),
+            "rate": row.rate * 100,
+            "total_invested": row.total_invested,
+            "estimated_value": row.future_value
+        }
+        for row in frame.itertuples()
+    ]
+
 def create_executor():
-    tools = [calculate_sip]
-    llm = Ollama(model="llama3")
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate
+    tools = [calculate_sip, calculate_sip_scenarios]
+    llm = ollama(EXECUTOR_MODEL)
     prompt = ChatPromptTemplate.from_template(
         "Execute this financial task: {input}\n\nUse tools if needed."
     )
     agent = create_tool_calling_agent(llm, tools, prompt)
     return AgentExecutor(agent=agent, tools=tools)
 
-executor = create_executor()
\ No newline at end of file
+def __getattr__(name):
+    if name == "executor":
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
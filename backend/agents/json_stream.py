@@ -0,0 +1,157 @@
+"""
+Incremental parsing of a streamed JSON object, one top-level member at a time.
+
+LLMs stream their answer token by token and often wrap the JSON in prose or
+get one part of it wrong. ``SectionParser`` hands back each top-level
+member's raw text as soon as its value closes, so the caller can use it
+before the rest has been generated and fix or re-request only the members
+that do not parse. ``repair_json`` patches the usual slips: single quotes,
+Python literals, trailing commas and unclosed brackets or strings.
+"""
+import json
+import re
+from typing import List, Tuple
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+class SectionParser:
+    def __init__(self):
+        self._state = "start"
+        self._buffer = []
+        self._key = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume ``chunk``; returns the (key, raw value) members it completed"""
+        closed = []
+        for char in chunk:
+            state = self._state
+            if state == "start":
+                if char == "{":  # anything before the object is prose
+                    self._state = "key"
+            elif state == "key":
+                if char == '"':
+                    self._state, self._buffer = "key_string", []
+                elif char == "}":
+                    self._finish_object()
+            elif state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._key = "".join(self._buffer)
+                    self._state = "colon"
+                    continue
+                self._buffer.append(char)
+            elif state == "colon":
+                if char == ":":
+                    self._state, self._buffer, self._depth = "value", [], 0
+            elif state == "value":
+                if self._in_string:
+                    self._buffer.append(char)
+                    if self._escape:
+                        self._escape = False
+                    elif char == "\\":
+                        self._escape = True
+                    elif char == '"':
+                        self._in_string = False
+                elif self._depth == 0 and char in ",}":
+                    # End of a scalar value
+                    raw = "".join(self._buffer).strip()
+                    if raw:
+                        closed.append((self._key, raw))
+                    if char == ",":
+                        self._state = "key"
+                    else:
+                        self._finish_object()
+                else:
+                    self._buffer.append(char)
+                    if char == '"':
+                        self._in_string = True
+                    elif char in "[{":
+                        self._depth += 1
+                    elif char in "]}":
+                        self._depth -= 1
+                        if self._depth <= 0:
+                            closed.append((self._key, "".join(self._buffer).strip()))
+                            self._state = "after"
+            elif state == "after":
+                if char == ",":
+                    self._state = "key"
+                elif char == "}":
+                    self._finish_object()
+        return closed
+
+    def _finish_object(self):
+        self._state = "done"
+        self.done = True
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """The member cut off by the end of the stream, if any; its text is incomplete, so re-request it"""
+        if self._state == "value" and "".join(self._buffer).strip():
+            return [(self._key, "".join(self._buffer).strip())]
+        return []
+
+def repair_json(text: str) -> str:
+    """Best-effort fix of almost-JSON text"""
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+    out, closers, quote = [], [], None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == "\\" and i + 1 < len(text):
+                # JSON has no \' escape
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            else:
+                out.append(char)
+        elif char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "[{":
+            closers.append("]" if char == "[" else "}")
+            out.append(char)
+        elif char in "]}":
+            _drop_trailing_comma(out)
+            if closers:
+                out.append(closers.pop())
+        elif char.isalpha():
+            # \w rather than [A-Za-z]: isalpha() is also true for non-ASCII letters
+            word = re.match(r"\w+", text[i:]).group()
+            out.append(PYTHON_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+    if quote:
+        out.append('"')
+    _drop_trailing_comma(out)
+    out.extend(reversed(closers))
+    return "".join(out)
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+def parse_value(raw: str):
+    """Parse ``raw`` as JSON, repairing it if needed; raises json.JSONDecodeError if both fail"""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(raw))
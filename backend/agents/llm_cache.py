@@ -0,0 +1,161 @@
+"""
+Response cache for the planner and reflector chains.
+
+Keys hash a canonical JSON form of the prompt payload together with the
+prompt template and the model name, so reordered keys, ``50000`` vs
+``50000.0`` or stray whitespace in a profile still hit, while a new prompt
+or model misses. Responses sit in an in-memory LRU in front of a SQLite
+table whose rows expire after ``ttl`` seconds. Entries remember the user
+they were made for so ``invalidate(user_id)`` can drop them when that
+user's data changes.
+"""
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from backend.tracing import count, record_llm, span
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_normalize(v) for v in value]
+        return sorted(items, key=json.dumps) if isinstance(value, set) else items
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if hasattr(value, "item"):  # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isfinite(value):
+        rounded = round(value, 6)
+        return int(rounded) if rounded.is_integer() else rounded
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    return str(value)
+
+def canonical(payload) -> str:
+    """Stable JSON text for ``payload``"""
+    return json.dumps(_normalize(payload), sort_keys=True, separators=(",", ":"))
+
+class LLMCache:
+    def __init__(self, path: str = "./llm_cache.sqlite", max_memory: int = 256, ttl: float = 7 * 86400):
+        self.max_memory = max_memory
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (response, created_at, user_id)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            user_id TEXT,
+            response TEXT,
+            created_at REAL
+        )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_user ON responses (user_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at)")
+        self.purge_expired()
+
+    @staticmethod
+    def key(payload, template: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{template}\0{canonical(payload)}".encode()).hexdigest()
+
+    def get(self, key: str):
+        """Cached response for ``key``, or None"""
+        with self._lock:
+            expired_before = time.time() - self.ttl
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] >= expired_before:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                count("llm_cache_lookups", result="memory_hit")
+                return entry[0]
+            row = self._db.execute(
+                "SELECT response, created_at, user_id FROM responses WHERE key = ? AND created_at >= ?",
+                (key, expired_before)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                count("llm_cache_lookups", result="miss")
+                return None
+            self._remember(key, row)
+            self.hits += 1
+            self.disk_hits += 1
+            count("llm_cache_lookups", result="disk_hit")
+            return row[0]
+
+    def set(self, key: str, response: str, user_id: str = None):
+        entry = (response, time.time(), None if user_id is None else str(user_id))
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                 (key, entry[2], response, entry[1]))
+            self._remember(key, entry)
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def cached(self, call: Callable[[], str], payload, template: str, model: str,
+               user_id: str = None, keep: Callable[[str], bool] = None) -> str:
+        """
+        Return the cached response for this prompt, or run ``call`` and cache its result.
+
+        ``call`` is only evaluated on a miss, so the chain behind it need not
+        be built at all when the answer is cached. Responses rejected by
+        ``keep`` are returned but not stored.
+        """
+        key = self.key(payload, template, model)
+        with span("llm.call", model=model) as current:
+            response = self.get(key)
+            current.set(cached=response is not None)
+            if response is None:
+                response = call()
+                record_llm(current, model, template + canonical(payload), str(response))
+                if keep is None or keep(response):
+                    self.set(key, response, user_id)
+        return response
+
+    def invalidate(self, user_id: str) -> int:
+        """Drop every response made for ``user_id``; returns the number of rows removed"""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key, entry in self._memory.items() if entry[2] == user_id]:
+                del self._memory[key]
+            with self._db:
+                return self._db.execute("DELETE FROM responses WHERE user_id = ?", (user_id,)).rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            expired_before = time.time() - self.ttl
+            for key in [key for key, entry in self._memory.items() if entry[1] < expired_before]:
+                del self._memory[key]
+            with self._db:
+                return self._db.execute("DELETE FROM responses WHERE created_at < ?", (expired_before,)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            with self._db:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.hits - self.disk_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
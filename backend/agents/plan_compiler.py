@@ -0,0 +1,166 @@
+"""
+Turn the structured parts of a plan into direct tool calls.
+
+The planner already returns goals and an allocation as JSON, so most of what
+the LLM executor would decide is mechanical: project a SIP for every goal
+with a monthly amount, simulate every goal with a target, and score the
+allocation. ``compile_plan`` does that in one batched call per tool and
+returns whatever it could not interpret, so the executor only sees the
+leftovers. The simulations are seeded, so the same plan gives the same
+results.
+"""
+import math
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from backend.tools.goals_stimulator import GoalSimulator
+from backend.tracing import traced
+from backend.tools.risk_assessment import RiskAssessor
+from backend.tools.sip_calculator import SIPCalculator
+
+GOAL_SECTIONS = {"short_term_goals": 1, "long_term_goals": 5}  # default horizon in years
+FIELDS = {
+    "name": ("goal", "name", "description", "title"),
+    "target": ("target", "target_amount", "amount", "goal_amount"),
+    "monthly": ("monthly", "monthly_investment", "monthly_contribution", "sip", "monthly_sip"),
+    "years": ("years", "horizon", "horizon_years", "timeline_years", "duration", "timeline"),
+    "rate": ("return_rate", "expected_return", "rate"),
+}
+ASSET_ALIASES = {
+    "equity": "equity", "equities": "equity", "stocks": "equity", "shares": "equity",
+    "debt": "debt", "bonds": "debt", "fixed_income": "debt", "fixed income": "debt",
+    "hybrid": "hybrid", "balanced": "hybrid",
+}
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        # Only a plain number, optionally with a trailing %; "5 lakh" or "₹50,00,000" go to the executor
+        text = value.strip().replace(",", "")
+        if text.endswith("%"):
+            text = text[:-1].rstrip()
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        return number if math.isfinite(number) else None
+    return None
+
+def _field(entry: dict, field: str):
+    for key in FIELDS[field]:
+        if key in entry:
+            return entry[key] if field == "name" else _number(entry[key])
+    return None
+
+def _unparsed(entry: dict) -> bool:
+    """True if any numeric field is present but not a number we can use"""
+    return any(
+        key in entry and entry[key] is not None and _number(entry[key]) is None
+        for field in ("target", "monthly", "years", "rate") for key in FIELDS[field]
+    )
+
+def _rate(value: float) -> float:
+    # Plans mix 12 and 0.12 for a 12% return
+    return value / 100 if value > 1 else value
+
+def _allocation(allocation) -> Optional[dict]:
+    """Allocation weights as fractions, or None if any weight is not a number"""
+    if not isinstance(allocation, dict) or not allocation:
+        return None
+    weights = {str(asset): _number(weight) for asset, weight in allocation.items()}
+    if any(weight is None or weight < 0 for weight in weights.values()) or not sum(weights.values()):
+        return None
+    total = sum(weights.values())
+    return {asset: weight / total for asset, weight in weights.items()}
+
+@traced()
+def compile_plan(plan: dict, profile: dict = None, seed: int = 0, n_paths: int = 2000) -> Tuple[dict, Optional[dict]]:
+    """
+    Run the recognized parts of ``plan``; returns ``(results, leftover)``.
+
+    ``leftover`` holds the plan entries that still need the LLM executor, or
+    None when everything was handled.
+    """
+    profile = profile or {}
+    if not isinstance(plan, dict) or "error" in plan:
+        return {}, plan
+    calculator = SIPCalculator()
+    results, leftover = {}, {}
+
+    default_rate = _number(profile.get("expected_return"))
+    default_rate = _rate(default_rate) if default_rate else calculator.historical_returns["hybrid"]
+    weights = _allocation(plan.get("allocation"))
+    if weights is not None:
+        known = {ASSET_ALIASES[asset.lower()]: weight for asset, weight in weights.items()
+                 if asset.lower() in ASSET_ALIASES}
+        if known:
+            mix = {asset: weight / sum(known.values()) for asset, weight in known.items()}
+            default_rate = float(calculator.blended_returns([mix])[0])
+        results["allocation_risk"] = dict(
+            RiskAssessor().portfolio_risk_analysis({asset: weight * 100 for asset, weight in weights.items()}),
+            expected_return=default_rate
+        )
+    elif "allocation" in plan:
+        leftover["allocation"] = plan["allocation"]
+
+    default_monthly = _number(profile.get("monthly_savings") or profile.get("monthly_investment"))
+    goals = []
+    for section, horizon in GOAL_SECTIONS.items():
+        for entry in plan.get(section) or []:
+            if not isinstance(entry, dict) or _unparsed(entry):
+                leftover.setdefault(section, []).append(entry)
+                continue
+            monthly = _field(entry, "monthly") or default_monthly
+            target = _field(entry, "target")
+            if not monthly:
+                leftover.setdefault(section, []).append(entry)
+                continue
+            rate = _field(entry, "rate")
+            goals.append({
+                "goal": str(_field(entry, "name") or section),
+                "target": target,
+                "monthly": monthly,
+                "years": max(1, int(round(_field(entry, "years") or horizon))),
+                "return_rate": _rate(rate) if rate else default_rate,
+            })
+    for key, value in plan.items():
+        if key not in GOAL_SECTIONS and key != "allocation":
+            leftover[key] = value
+
+    if goals:
+        goals = pd.DataFrame(goals)
+        projection = calculator.project_grid(
+            goals["monthly"].to_numpy(), goals["years"].to_numpy(), rates=goals["return_rate"].to_numpy(), grid=False
+        )
+        results["sip_projections"] = [
+            {
+                "goal": goal,
+                "principal": float(row.amount),
+                "years": int(row.years),
+                "rate": float(row.rate) * 100,
+                "total_invested": float(row.total_invested),
+                "estimated_value": float(row.future_value)
+            }
+            for goal, row in zip(goals["goal"], projection.itertuples())
+        ]
+        targeted = goals[goals["target"].notna()]
+        if len(targeted):
+            simulated = GoalSimulator(seed=seed).simulate_many(targeted, n_paths=n_paths, workers=1)
+            results["goal_feasibility"] = [
+                {
+                    "goal": row.goal,
+                    "target": float(row.target),
+                    "monthly": float(row.monthly),
+                    "years": int(row.years),
+                    "success_rate": float(row.success_rate),
+                    "p10": float(row.p10),
+                    "p50": float(row.p50),
+                    "p90": float(row.p90)
+                }
+                for row in simulated.itertuples()
+            ]
+    return results, leftover or None
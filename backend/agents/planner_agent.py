@@ -1,14 +1,15 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.llms import Ollama
-from typing import TypedDict, List
+from typing import Callable, Iterator, Tuple, TypedDict, List
 import json
+import logging
+import time
+from backend.tracing import current_span, record_llm, span
+from .json_stream import SectionParser, parse_value
+from .registry import get, ollama
 
-class PlannerState(TypedDict):
-    goals: List[str]
-    profile: dict
+logger = logging.getLogger(__name__)
 
-def initialize_planner():
-    prompt = ChatPromptTemplate.from_template("""
+PLANNER_MODEL = "mistral"
+PLANNER_TEMPLATE = """
     Analyze this financial profile:
     {profile}
     
@@ -18,14 +19,118 @@ def initialize_planner():
     3. Recommended asset allocation
     
     Format as JSON with: short_term_goals, long_term_goals, allocation
-    """)
-    return prompt | Ollama(model="mistral")
+    """
+# Used to re-request a single section that came back missing or malformed
+SECTION_TEMPLATE = """
+    Analyze this financial profile:
+    {profile}
+    
+    Generate only the {section} of a financial plan: {description}.
+    
+    Reply with just the JSON value for "{section}", nothing else.
+    """
+PLAN_SECTIONS = {
+    "short_term_goals": "a JSON list of 3 short-term (1y) goals",
+    "long_term_goals": "a JSON list of 2 long-term (5y) goals",
+    "allocation": "a JSON object mapping asset classes to their recommended percentage",
+}
+
+class PlannerState(TypedDict):
+    goals: List[str]
+    profile: dict
+
+def initialize_planner():
+    from langchain_core.prompts import ChatPromptTemplate
+    prompt = ChatPromptTemplate.from_template(PLANNER_TEMPLATE)
+    return prompt | ollama(PLANNER_MODEL)
+
+def initialize_section_planner():
+    from langchain_core.prompts import ChatPromptTemplate
+    prompt = ChatPromptTemplate.from_template(SECTION_TEMPLATE)
+    return prompt | ollama(PLANNER_MODEL)
+
+def __getattr__(name):
+    if name == "planner":
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _request_section(profile: dict, section: str):
+    payload = {"profile": profile, "section": section, "description": PLAN_SECTIONS[section]}
+    cache = get("llm_cache")
+    key = cache.key(payload, SECTION_TEMPLATE, PLANNER_MODEL)
+    with span("llm.call", model=PLANNER_MODEL, section=section) as current:
+        response = cache.get(key)
+        current.set(cached=response is not None)
+        if response is None:
+            response = get("section_planner").invoke(payload)
+            record_llm(current, PLANNER_MODEL, SECTION_TEMPLATE + json.dumps(payload, default=str), response)
+    value = parse_value(response)
+    cache.set(key, response, profile.get("user_id"))
+    return value
+
+def stream_plan(state: PlannerState, stream: bool = True) -> Iterator[Tuple[str, object]]:
+    """
+    Yield ``(section, value)`` pairs of the plan as each one is complete.
+
+    With ``stream=True`` sections are parsed while the model is still
+    generating. A section that does not parse is repaired, and failing that
+    re-requested on its own along with any section the model left out or
+    that the stream cut off; the rest of the plan is kept either way.
+    Complete plans are cached.
+    """
+    profile = state["profile"] or {}
+    payload = {"profile": state["profile"]}
+    cache = get("llm_cache")
+    key = cache.key(payload, PLANNER_TEMPLATE, PLANNER_MODEL)
+    # Timings go on the caller's span (the planner node), if there is one
+    current, started, received = current_span(), time.perf_counter(), []
+    cached = cache.get(key)
+    if cached is not None:
+        chunks = [cached]
+    elif stream:
+        chunks = get("planner").stream(payload)
+    else:
+        chunks = [get("planner").invoke(payload)]
+
+    plan, parser = {}, SectionParser()
+
+    def settle(pieces):
+        for section, raw in pieces:
+            try:
+                plan[section] = parse_value(raw)
+                if current is not None and "first_section_seconds" not in current.attributes:
+                    current.set(first_section_seconds=time.perf_counter() - started)
+                yield section, plan[section]
+            except json.JSONDecodeError:
+                logger.warning("Planner returned a malformed %s section", section)
 
-planner = initialize_planner()
+    for chunk in chunks:
+        received.append(chunk)
+        yield from settle(parser.feed(chunk))
+        if parser.done:
+            break
+    for section, _ in parser.finish():
+        # Closing the brackets of a cut-off value would silently drop whatever was not generated
+        logger.warning("Planner output ended inside the %s section", section)
+    if cached is None:
+        record_llm(current, PLANNER_MODEL, PLANNER_TEMPLATE + json.dumps(payload, default=str), "".join(received))
+    elif current is not None:
+        current.set(cached=True)
+    for section in PLAN_SECTIONS:
+        if section not in plan:
+            try:
+                plan[section] = _request_section(profile, section)
+                yield section, plan[section]
+            except json.JSONDecodeError:
+                logger.warning("Re-requested %s section is still malformed", section)
+    if cached is None and all(section in plan for section in PLAN_SECTIONS):
+        cache.set(key, json.dumps(plan), profile.get("user_id"))
 
-def generate_plan(state: PlannerState):
-    response = planner.invoke({"profile": state["profile"]})
-    try:
-        return json.loads(response)
-    except:
-        return {"error": "Failed to parse plan"}
\ No newline at end of file
+def generate_plan(state: PlannerState, on_section: Callable[[str, object], None] = None):
+    """The full plan; ``on_section`` streams the generation and gets each section as soon as it is ready"""
+    plan = {}
+    for section, value in stream_plan(state, stream=on_section is not None):
+        plan[section] = value
+        if on_section is not None:
+            on_section(section, value)
+    return plan or {"error": "Failed to parse plan"}
\ No newline at end of file
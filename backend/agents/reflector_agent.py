@@ -1,12 +1,10 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.llms import Ollama
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+import json
 
-embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
+from .json_stream import parse_value
+from .registry import get, ollama
 
-def setup_reflector():
-    prompt = ChatPromptTemplate.from_template("""
+REFLECTOR_MODEL = "mixtral"
+REFLECTOR_TEMPLATE = """
     Analyze financial results:
     {results}
     
@@ -16,8 +14,29 @@ def setup_reflector():
     3. Suggested adjustments
     
     Format as JSON with keys: strengths, improvements, adjustments
-    """)
-    return prompt | Ollama(model="mixtral")
+    """
+
+def setup_reflector():
+    from langchain_core.prompts import ChatPromptTemplate
+    prompt = ChatPromptTemplate.from_template(REFLECTOR_TEMPLATE)
+    return prompt | ollama(REFLECTOR_MODEL)
+
+def _is_insights(response) -> bool:
+    # Only replies that parse to the JSON object the prompt asks for are worth caching
+    try:
+        return isinstance(parse_value(str(response)), dict)
+    except json.JSONDecodeError:
+        return False
+
+def reflect_on(results, user_id: str = None):
+    """Reflector insights for ``results``, served from the response cache when possible"""
+    payload = {"results": results}
+    return get("llm_cache").cached(
+        lambda: get("reflector").invoke(payload), payload, REFLECTOR_TEMPLATE, REFLECTOR_MODEL,
+        user_id=user_id, keep=_is_insights
+    )
 
-reflector = setup_reflector()
-vector_db = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
\ No newline at end of file
+def __getattr__(name):
+    if name in ("reflector", "vector_db"):
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
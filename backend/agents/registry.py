@@ -0,0 +1,118 @@
+"""
+Agents, models and stores built on first use.
+
+Nothing heavy happens at import time: each component is created the first
+time ``get`` asks for it and the same instance is handed out after that.
+Servers call ``warm_up()`` at startup to pay the construction cost before
+the first request instead.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable
+
+class ComponentRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], object]] = {}
+        self._instances: Dict[str, object] = {}
+        self._lock = threading.RLock()
+        self.build_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], object] = None):
+        """Register ``factory`` under ``name``; usable as a decorator"""
+        def add(factory):
+            with self._lock:
+                self._factories[name] = factory
+                self._instances.pop(name, None)
+            return factory
+        return add(factory) if factory is not None else add
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:  # re-entrant: factories may ask for their dependencies
+                instance = self._instances.get(name)
+                if instance is None:
+                    if name not in self._factories:
+                        raise KeyError(f"No component registered as {name!r}")
+                    started = time.perf_counter()
+                    instance = self._factories[name]()
+                    self.build_seconds[name] = time.perf_counter() - started
+                    self._instances[name] = instance
+        return instance
+
+    def built(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, names: Iterable[str] = None) -> Dict[str, float]:
+        """Build the named components (default: all); returns seconds spent on each"""
+        names = list(names or self._factories)
+        for name in names:
+            self.get(name)
+        return {name: self.build_seconds[name] for name in names}
+
+    def reset(self, name: str = None):
+        """Drop a built instance (or all of them) so the next ``get`` rebuilds it"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+registry = ComponentRegistry()
+
+def ollama(model: str):
+    """An Ollama client for ``model`` on the server named by OLLAMA_BASE_URL"""
+    from langchain_community.llms import Ollama
+    return Ollama(model=model, base_url=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"))
+
+@registry.register("planner")
+def _planner():
+    from .planner_agent import initialize_planner
+    return initialize_planner()
+
+@registry.register("section_planner")
+def _section_planner():
+    from .planner_agent import initialize_section_planner
+    return initialize_section_planner()
+
+@registry.register("executor")
+def _executor():
+    from .executor_agent import create_executor
+    return create_executor()
+
+@registry.register("reflector")
+def _reflector():
+    from .reflector_agent import setup_reflector
+    return setup_reflector()
+
+@registry.register("llm_cache")
+def _llm_cache():
+    from .llm_cache import LLMCache
+    return LLMCache()
+
+@registry.register("embedding_model")
+def _embedding_model():
+    from backend.memory.embeddings import get_embeddings
+    return get_embeddings().model
+
+@registry.register("vector_db")
+def _vector_db():
+    from backend.memory.chorma_setup import get_vector_db
+    return get_vector_db()
+
+@registry.register("user_memory")
+def _user_memory():
+    from backend.memory.user_profiles import get_user_memory
+    return get_user_memory()
+
+@registry.register("financial_workflow")
+def _workflow():
+    from .agent_workflow import create_workflow
+    return create_workflow()
+
+def get(name: str):
+    return registry.get(name)
+
+def warm_up(names: Iterable[str] = None) -> Dict[str, float]:
+    return registry.warm_up(names)
@@ -0,0 +1,174 @@
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+class _ThreadToken:
+    """Lives in a thread's local storage, so it is collected when the thread exits"""
+    __slots__ = ("__weakref__",)
+
+class ConnectionPool:
+    """
+    Concurrency layer for one SQLite database in WAL mode.
+
+    Every thread reads through its own connection, so readers never share a
+    connection or wait on each other. All writes go through a queue to a
+    single writer thread, which drains up to ``max_batch`` queued jobs, runs
+    each in its own savepoint of one transaction and commits them together
+    (group commit). A failing job only rolls back its own savepoint.
+
+    A read connection is closed when its thread exits, never while its
+    thread may still be using it. A thread that needs a connection while
+    ``max_readers`` are open waits up to ``busy_timeout`` for another thread
+    to exit, then opens one past the limit (counted as ``overflow_readers``).
+    """
+
+    def __init__(self, db_path: str, busy_timeout: float = 5.0, max_batch: int = 256,
+                 max_queue: int = 10_000, max_readers: int = 64):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.max_batch = max_batch
+        self.max_readers = max_readers
+        self._local = threading.local()
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._reader_ids = itertools.count()
+        # Re-entrant: a reader's finalizer may run on a thread that already holds the lock
+        self._lock = threading.RLock()
+        self._reader_freed = threading.Condition(self._lock)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats = {
+            "reads": 0,
+            "read_wait_seconds": 0.0,
+            "writes": 0,
+            "failed_writes": 0,
+            "write_wait_seconds": 0.0,
+            "batches": 0,
+            "max_queue_depth": 0,
+            "overflow_readers": 0
+        }
+        self._writer = threading.Thread(target=self._run_writer, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False, **kwargs)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def reader(self) -> sqlite3.Connection:
+        """The calling thread's read connection, opened on first use"""
+        started = time.perf_counter()
+        key = getattr(self._local, "key", None)
+        conn = self._readers.get(key) if key is not None else None
+        if conn is None:
+            with self._reader_freed:
+                if not self._reader_freed.wait_for(lambda: len(self._readers) < self.max_readers,
+                                                   timeout=self.busy_timeout):
+                    self._stats["overflow_readers"] += 1
+            conn = self._connect()
+            key = self._local.key = next(self._reader_ids)
+            self._local.token = _ThreadToken()
+            weakref.finalize(self._local.token, self._release, key, conn)
+            with self._lock:
+                self._readers[key] = conn
+        self._count(reads=1, read_wait_seconds=time.perf_counter() - started)
+        return conn
+
+    def _release(self, key: int, conn: sqlite3.Connection):
+        # The owning thread has exited
+        with self._reader_freed:
+            if self._readers.pop(key, None) is not None:
+                self._reader_freed.notify()
+        conn.close()
+
+    def submit(self, job: Callable[[sqlite3.Connection], object]) -> Future:
+        """Queue ``job(conn)`` for the writer; the future resolves once its batch has committed"""
+        future = Future()
+        self._queue.put((job, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        return future
+
+    def write(self, job: Callable[[sqlite3.Connection], object]):
+        """Run ``job(conn)`` on the writer and wait for it to commit"""
+        return self.submit(job).result()
+
+    def _run_writer(self):
+        # Autocommit mode: the writer issues BEGIN/COMMIT itself
+        conn = self._connect(isolation_level=None)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch):
+        started = time.perf_counter()
+        outcomes = []
+        failed = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future, _ in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, job(conn), None))
+                    conn.execute("RELEASE job")
+                except Exception as error:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, error))
+                    failed += 1
+            conn.execute("COMMIT")
+        except Exception as error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(future, None, error) for _, future, _ in batch]
+            failed = len(batch)
+        self._count(
+            writes=len(batch),
+            failed_writes=failed,
+            batches=1,
+            write_wait_seconds=sum(started - enqueued for _, _, enqueued in batch)
+        )
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "queue_depth": self._queue.qsize()}
+
+    def close(self):
+        """Finish queued writes, stop the writer and close every connection"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+        for conn in readers:
+            conn.close()
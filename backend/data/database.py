@@ -1,13 +1,69 @@
+import logging
+import os
 import sqlite3
-from typing import Dict, List
+import time
+from datetime import date
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+from .connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_COLUMNS = ("date", "amount", "category", "description")
 
 class FinancialDatabase:
-    def __init__(self, db_path: str = "finautica.db"):
-        self.conn = sqlite3.connect(db_path)
-        self._create_tables()
+    def __init__(self, db_path: str = "finautica.db", pool: bool = False, busy_timeout: float = 5.0):
+        """
+        With ``pool=True`` the database is safe to share between threads (e.g.
+        Streamlit sessions): each thread reads on its own WAL connection and
+        writes are group-committed by a single writer, see ``ConnectionPool``.
+        """
+        self.pool = ConnectionPool(db_path, busy_timeout) if pool else None
+        if self.pool is None:
+            self._conn = sqlite3.connect(db_path, timeout=busy_timeout)
+            self._conn.row_factory = sqlite3.Row
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._write(self._create_tables)
 
-    def _create_tables(self):
-        cursor = self.conn.cursor()
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection for reads: the calling thread's pooled connection, or the only one"""
+        return self.pool.reader() if self.pool is not None else self._conn
+
+    def _write(self, job: Callable[[sqlite3.Connection], object]):
+        """Run ``job(conn)`` in a write transaction and commit it"""
+        if self.pool is not None:
+            return self.pool.write(job)
+        with self._conn:
+            return job(self._conn)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        else:
+            self._conn.close()
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Call ``listener`` with every transaction once it has been committed"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Dict], None]):
+        self._listeners.remove(listener)
+
+    def _notify(self, transaction: Dict):
+        # The row is already committed: a failing listener must not look like a failed insert
+        for listener in self._listeners:
+            try:
+                listener(transaction)
+            except Exception:
+                logger.exception("Transaction listener %r failed", listener)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        has_summary = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_category_summary'"
+        ).fetchone()
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY,
@@ -17,6 +73,20 @@ class FinancialDatabase:
             description TEXT
         )
         """)
+        # Lets de-duplicated bulk loads probe for an existing row without a table scan
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_dedup
+        ON transactions (date, amount, description)
+        """)
+        # (date) implicitly ends in the rowid, so it also serves ORDER BY date, id pagination
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_date
+        ON transactions (date)
+        """)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_date
+        ON transactions (category, date)
+        """)
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS investment_goals (
             id INTEGER PRIMARY KEY,
@@ -26,11 +96,119 @@ class FinancialDatabase:
             priority INTEGER
         )
         """)
-        self.conn.commit()
+        self._create_summary(cursor)
+        # Summaries written before NULL categories were folded into '' hold duplicate rows
+        if not has_summary or cursor.execute(
+            "SELECT 1 FROM monthly_category_summary WHERE category IS NULL LIMIT 1"
+        ).fetchone():
+            self._rebuild_summary(conn)
 
-    def add_transaction(self, transaction: Dict):
-        cursor = self.conn.cursor()
+    def _create_summary(self, cursor):
+        """
+        Per-month, per-category rollup of transactions, kept current by triggers.
+
+        Uncategorised transactions are summarised under ``''``: a NULL key
+        would never conflict in the upsert or match in the delete trigger.
+        """
         cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_category_summary (
+            month TEXT,
+            category TEXT,
+            total REAL,
+            count INTEGER,
+            min_amount REAL,
+            max_amount REAL,
+            PRIMARY KEY (month, category)
+        )
+        """)
+        add = """
+            INSERT INTO monthly_category_summary
+            VALUES (substr(NEW.date, 1, 7), coalesce(NEW.category, ''), NEW.amount, 1, NEW.amount, NEW.amount)
+            ON CONFLICT (month, category) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + 1,
+                min_amount = min(min_amount, excluded.min_amount),
+                max_amount = max(max_amount, excluded.max_amount);
+        """
+        # Removing the current min or max means re-reading that month's rows for the
+        # category, which is an index range scan on (category, date).
+        same_category = "(category = coalesce(OLD.category, '') OR (category IS NULL AND coalesce(OLD.category, '') = ''))"
+        remove = f"""
+            UPDATE monthly_category_summary SET
+                total = total - OLD.amount,
+                count = count - 1,
+                min_amount = CASE WHEN OLD.amount > min_amount THEN min_amount ELSE (
+                    SELECT min(amount) FROM transactions
+                    WHERE {same_category}
+                    AND date >= substr(OLD.date, 1, 7) || '-01'
+                    AND date < date(substr(OLD.date, 1, 7) || '-01', '+1 month')
+                ) END,
+                max_amount = CASE WHEN OLD.amount < max_amount THEN max_amount ELSE (
+                    SELECT max(amount) FROM transactions
+                    WHERE {same_category}
+                    AND date >= substr(OLD.date, 1, 7) || '-01'
+                    AND date < date(substr(OLD.date, 1, 7) || '-01', '+1 month')
+                ) END
+            WHERE month = substr(OLD.date, 1, 7) AND category = coalesce(OLD.category, '');
+            DELETE FROM monthly_category_summary
+            WHERE month = substr(OLD.date, 1, 7) AND category = coalesce(OLD.category, '') AND count <= 0;
+        """
+        # Recreated every time so databases with older trigger bodies pick up changes
+        for trigger in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS transactions_summary_{trigger}")
+        cursor.execute(f"""
+        CREATE TRIGGER transactions_summary_insert
+        AFTER INSERT ON transactions BEGIN {add} END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER transactions_summary_delete
+        AFTER DELETE ON transactions BEGIN {remove} END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER transactions_summary_update
+        AFTER UPDATE OF date, amount, category ON transactions BEGIN {remove} {add} END
+        """)
+
+    @staticmethod
+    def _rebuild_summary(conn: sqlite3.Connection):
+        conn.execute("DELETE FROM monthly_category_summary")
+        conn.execute("""
+        INSERT INTO monthly_category_summary
+        SELECT substr(date, 1, 7), coalesce(category, ''), sum(amount), count(*), min(amount), max(amount)
+        FROM transactions
+        GROUP BY substr(date, 1, 7), coalesce(category, '')
+        """)
+
+    def rebuild_summary(self):
+        """Recompute the monthly summary from the raw transactions"""
+        self._write(self._rebuild_summary)
+
+    def get_monthly_summary(self, start_month: str = None, end_month: str = None,
+                            category: str = None) -> List[Dict]:
+        """Monthly totals, counts, min and max per category; ``end_month`` is inclusive"""
+        conditions, params = [], []
+        if start_month:
+            conditions.append("month >= ?")
+            params.append(start_month)
+        if end_month:
+            conditions.append("month <= ?")
+            params.append(end_month)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        cursor = self.conn.execute(
+            "SELECT * FROM monthly_category_summary" + where + " ORDER BY month, category", params
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_categories(self) -> List[str]:
+        """Every category seen so far, read from the rollup rather than the raw rows"""
+        cursor = self.conn.execute("SELECT DISTINCT category FROM monthly_category_summary ORDER BY category")
+        return [row[0] for row in cursor.fetchall()]
+
+    def add_transaction(self, transaction: Dict):
+        self._write(lambda conn: conn.execute("""
         INSERT INTO transactions (date, amount, category, description)
         VALUES (?, ?, ?, ?)
         """, (
@@ -38,16 +216,189 @@ class FinancialDatabase:
             transaction["amount"],
             transaction["category"],
             transaction["description"]
-        ))
-        self.conn.commit()
+        )))
+        self._notify(transaction)
 
-    def get_transactions(self, month: str = None) -> List[Dict]:
-        cursor = self.conn.cursor()
-        if month:
-            cursor.execute("""
-            SELECT * FROM transactions 
-            WHERE strftime('%Y-%m', date) = ?
-            """, (month,))
+    def _batches(self, transactions, batch_size: int) -> Iterator[List[Tuple]]:
+        if isinstance(transactions, (str, os.PathLike)):
+            frames = pd.read_csv(transactions, usecols=list(TRANSACTION_COLUMNS), chunksize=batch_size)
+        elif isinstance(transactions, pd.DataFrame):
+            frames = (transactions.iloc[i:i + batch_size] for i in range(0, len(transactions), batch_size))
+        else:
+            rows = iter(transactions)
+            while batch := [
+                tuple(row[column] for column in TRANSACTION_COLUMNS)
+                for row in islice(rows, batch_size)
+            ]:
+                yield batch
+            return
+        for frame in frames:
+            frame = frame[list(TRANSACTION_COLUMNS)]
+            if pd.api.types.is_datetime64_any_dtype(frame["date"]):
+                frame = frame.assign(date=frame["date"].dt.strftime("%Y-%m-%d"))
+            yield list(frame.itertuples(index=False, name=None))
+
+    def add_transactions(self, transactions: Union[Iterable[Dict], pd.DataFrame, str],
+                         batch_size: int = 10_000, deduplicate: bool = False) -> Dict:
+        """
+        Bulk-load transactions from an iterable of dicts, a DataFrame or a CSV path.
+
+        Everything is inserted in a single transaction, with relaxed syncing
+        and a larger page cache for the duration of the load. The database is
+        also switched to WAL journaling, which is persistent and stays on
+        afterwards (pooled databases always use it). With ``deduplicate=True``
+        rows matching an existing (date, amount, description) are skipped, so
+        re-importing a statement is idempotent. Returns the number of rows
+        inserted and skipped and the load rate.
+        """
+        if deduplicate:
+            sql = """
+            INSERT INTO transactions (date, amount, category, description)
+            SELECT ?1, ?2, ?3, ?4
+            WHERE NOT EXISTS (
+                SELECT 1 FROM transactions
+                WHERE date = ?1 AND amount = ?2 AND description = ?4
+            )
+            """
+        else:
+            sql = """
+            INSERT INTO transactions (date, amount, category, description)
+            VALUES (?, ?, ?, ?)
+            """
+        def load(conn: sqlite3.Connection):
+            cursor = conn.cursor()
+            offered = inserted = 0
+            added = []
+            for batch in self._batches(transactions, batch_size):
+                offered += len(batch)
+                if self._listeners:
+                    # Row by row, so listeners only hear about rows that were actually inserted
+                    for row in batch:
+                        if cursor.execute(sql, row).rowcount:
+                            added.append(dict(zip(TRANSACTION_COLUMNS, row)))
+                    inserted = len(added)
+                else:
+                    inserted += cursor.executemany(sql, batch).rowcount
+            return offered, inserted, added
+
+        started = time.perf_counter()
+        if self.pool is not None:
+            offered, inserted, added = self._write(load)
         else:
-            cursor.execute("SELECT * FROM transactions")
-        return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+            cursor = self._conn.cursor()
+            restore = {
+                pragma: cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("synchronous", "temp_store", "cache_size")
+            }
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            cursor.execute("PRAGMA cache_size = -65536")
+            try:
+                offered, inserted, added = self._write(load)
+            finally:
+                for pragma, value in restore.items():
+                    cursor.execute(f"PRAGMA {pragma} = {value}")
+        elapsed = time.perf_counter() - started
+
+        for transaction in added:
+            self._notify(transaction)
+        return {
+            "rows": inserted,
+            "skipped": offered - inserted,
+            "seconds": elapsed,
+            "rows_per_second": inserted / elapsed if elapsed > 0 else float("inf")
+        }
+
+    @staticmethod
+    def _month_range(month: str) -> Tuple[str, str]:
+        """Turn 'YYYY-MM' into the [first day, first day of next month) date range"""
+        year, mon = map(int, month.split("-"))
+        start = date(year, mon, 1)
+        end = date(year + mon // 12, mon % 12 + 1, 1)
+        return start.isoformat(), end.isoformat()
+
+    def _filter_clause(self, month: str = None, start: str = None, end: str = None,
+                       category: str = None, min_amount: float = None, max_amount: float = None,
+                       after: Optional[Tuple[str, int]] = None) -> Tuple[str, list]:
+        """
+        WHERE clause for the transaction filters, written so SQLite can use the indexes.
+
+        Dates are compared as ISO strings against a half-open [start, end) range.
+        """
+        if month:
+            month_start, month_end = self._month_range(month)
+            start = max(start, month_start) if start else month_start
+            end = min(end, month_end) if end else month_end
+        conditions, params = [], []
+        if start:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end:
+            conditions.append("date < ?")
+            params.append(end)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if min_amount is not None:
+            conditions.append("amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            conditions.append("amount <= ?")
+            params.append(max_amount)
+        if after:
+            conditions.append("(date, id) > (?, ?)")
+            params.extend(after)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def _select_transactions(self, columns: str = "*", limit: int = None, **filters) -> Tuple[str, list]:
+        where, params = self._filter_clause(**filters)
+        sql = f"SELECT {columns} FROM transactions" + where + " ORDER BY date, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    def iter_transactions(self, chunk_size: int = 10_000, **filters) -> Iterator[Dict]:
+        """Stream transactions as dicts, holding at most ``chunk_size`` rows at a time"""
+        cursor = self.conn.execute(*self._select_transactions(**filters))
+        while rows := cursor.fetchmany(chunk_size):
+            for row in rows:
+                yield dict(row)
+
+    def iter_transaction_frames(self, chunk_size: int = 100_000, **filters) -> Iterator[pd.DataFrame]:
+        """
+        Stream transactions as typed DataFrames of at most ``chunk_size`` rows.
+
+        Dates are parsed, amounts are float32 and every chunk shares one
+        categorical dtype for ``category``, so chunks concatenate without
+        falling back to object columns.
+        """
+        categories = pd.CategoricalDtype(self.get_categories())
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(*self._select_transactions("id, date, amount, category, description", **filters))
+        columns = [column[0] for column in cursor.description]
+        while rows := cursor.fetchmany(chunk_size):
+            frame = pd.DataFrame.from_records(rows, columns=columns)
+            yield frame.astype({
+                "date": "datetime64[ns]",
+                "amount": "float32",
+                "category": categories
+            })
+
+    def get_transactions(self, month: str = None, start: str = None, end: str = None,
+                         category: str = None, min_amount: float = None, max_amount: float = None,
+                         limit: int = None, after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """
+        Transactions ordered by (date, id), optionally filtered.
+
+        ``month`` ('YYYY-MM') and ``start``/``end`` (ISO dates, end exclusive)
+        become index range scans. For pagination pass ``limit`` and, for the
+        next page, ``after`` set to the (date, id) of the last row returned.
+        Use ``iter_transactions``/``iter_transaction_frames`` for large results.
+        """
+        return list(self.iter_transactions(
+            month=month, start=start, end=end, category=category, min_amount=min_amount,
+            max_amount=max_amount, limit=limit, after=after
+        ))
\ No newline at end of file
@@ -1,21 +1,146 @@
+import os
 import pandas as pd
-from datetime import datetime, timedelta
-import random
-
-def generate_sample_transactions(num: int = 200):
-    categories = [
-        "Groceries", "Dining", "Transport", 
-        "Housing", "Utilities", "Entertainment"
-    ]
-    data = []
-    for _ in range(num):
-        date = (datetime.now() - timedelta(days=random.randint(0, 365))).strftime("%Y-%m-%d")
-        category = random.choice(categories)
-        amount = round(random.uniform(100, 5000) / 50) * 50
-        data.append({
-            "date": date,
-            "amount": amount,
-            "category": category,
-            "description": f"Payment for {category}"
-        })
-    return pd.DataFrame(data)
\ No newline at end of file
+import numpy as np
+from datetime import date, timedelta
+from typing import Iterator
+from .database import FinancialDatabase
+from .snapshot import TransactionSnapshot
+
+# Day-to-day spending: (share of transactions, median amount, lognormal sigma, weekend multiplier)
+SPENDING_PROFILES = {
+    "Groceries": (0.35, 900, 0.5, 1.3),
+    "Dining": (0.25, 650, 0.6, 1.8),
+    "Transport": (0.3, 250, 0.7, 0.6),
+    "Entertainment": (0.1, 1200, 0.8, 2.0),
+}
+# Monthly bills: (lowest, highest) amount a user pays, and the bill description
+RECURRING_BILLS = {
+    "Housing": ((15000, 60000), "Rent"),
+    "Utilities": ((1500, 6000), "Electricity and water bill"),
+}
+# Relative spend by calendar month, January first (festive season in Oct-Dec)
+MONTHLY_SEASONALITY = np.array([0.9, 0.85, 0.95, 1.0, 1.0, 0.95, 0.95, 1.0, 1.05, 1.2, 1.25, 1.3])
+# Histories end here unless told otherwise, so generated data never depends on the day it runs
+DEFAULT_END = date(2024, 12, 31)
+
+def _user_block(rng: np.random.Generator, users: np.ndarray, counts: np.ndarray,
+                start: np.datetime64, days: int, recurring: bool) -> pd.DataFrame:
+    """Transactions for a block of users; ``counts`` is each user's number of day-to-day spends"""
+    calendar = start + np.arange(days)
+    weekend = (calendar.astype("datetime64[D]").view("int64") - 4) % 7 >= 5  # 1970-01-01 was a Thursday
+    season = MONTHLY_SEASONALITY[calendar.astype("datetime64[M]").view("int64") % 12]
+
+    categories = list(SPENDING_PROFILES)
+    share, median, sigma, weekend_factor = map(np.array, zip(*SPENDING_PROFILES.values()))
+    user = np.repeat(users, counts)
+    category = rng.choice(len(categories), size=len(user), p=share / share.sum())
+    day = np.empty(len(user), dtype=np.int64)
+    for code in range(len(categories)):
+        rows = np.flatnonzero(category == code)
+        weights = season * np.where(weekend, weekend_factor[code], 1.0)
+        day[rows] = rng.choice(days, size=len(rows), p=weights / weights.sum())
+    amount = rng.lognormal(np.log(median[category]), sigma[category]) * season[day]
+    descriptions = np.array([f"Payment for {c}" for c in categories], dtype=object)
+    frames = [pd.DataFrame({
+        "user_id": user,
+        "date": calendar[day],
+        "amount": np.maximum(10, np.round(amount / 10) * 10),
+        "category": np.array(categories, dtype=object)[category],
+        "description": descriptions[category],
+    })]
+
+    if recurring:
+        months = np.arange(calendar[0].astype("datetime64[M]"), calendar[-1].astype("datetime64[M]") + 1)
+        due = rng.integers(0, 28, len(users))  # each user's day of the month
+        for bill, ((low, high), description) in RECURRING_BILLS.items():
+            base = np.round(rng.uniform(low, high, len(users)) / 100) * 100
+            dates = months[None, :].astype("datetime64[D]") + due[:, None]
+            amount = base[:, None] * np.ones(len(months))
+            if bill == "Utilities":
+                amount = np.round(amount * MONTHLY_SEASONALITY[months.view("int64") % 12]
+                                  * rng.normal(1, 0.1, amount.shape), -1)
+            # Bills due outside a partial first or last month fall on the window's edge
+            dates = np.clip(dates, calendar[0], calendar[-1])
+            frames.append(pd.DataFrame({
+                "user_id": np.repeat(users, len(months)),
+                "date": dates.ravel(),
+                "amount": amount.ravel(),
+                "category": bill,
+                "description": description,
+            }))
+
+    frame = pd.concat(frames, ignore_index=True)
+    frame = frame.iloc[np.lexsort((frame["date"].to_numpy(), frame["user_id"].to_numpy()))]
+    frame["date"] = frame["date"].to_numpy().astype("datetime64[D]").astype(str)
+    return frame.reset_index(drop=True)
+
+def generate_transactions(num_rows: int, num_users: int = 1, seed: int = 0, days: int = 365,
+                          end: date = DEFAULT_END, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Stream a reproducible synthetic history for ``num_users`` users, ``chunk_size`` rows at a time.
+
+    Users pay monthly bills on a fixed day and spend day to day with
+    per-category lognormal amounts, weekend and calendar-month seasonality.
+    Memory stays bounded by ``chunk_size`` however many rows are requested.
+    The same arguments always produce the same rows: ``end`` defaults to a
+    fixed date rather than today, so pass it to get a current history.
+    """
+    start = np.datetime64(end - timedelta(days=days - 1), "D")
+    per_user, extra = divmod(num_rows, num_users)
+    months = len(np.arange(start.astype("datetime64[M]"), np.datetime64(end, "M") + 1))
+    bills = months * len(RECURRING_BILLS)
+    recurring = per_user >= bills
+    entropy = np.random.SeedSequence(seed).entropy
+
+    def counts(users):
+        # Spends per user, after their bills; the first ``extra`` users get one more
+        return per_user - (bills if recurring else 0) + (users < extra)
+
+    block = 0
+    if per_user + 1 > chunk_size:
+        # Heavy users: split each one's history across several chunks
+        for user in range(num_users):
+            remaining = counts(np.array([user]))[0]
+            first = True
+            while remaining > 0 or first:
+                size = min(remaining, chunk_size)
+                rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(block,)))
+                yield _user_block(rng, np.array([user]), np.array([size]), start, days, recurring and first)
+                remaining -= size
+                first = False
+                block += 1
+        return
+    users_per_block = max(1, chunk_size // (per_user + 1))
+    for first_user in range(0, num_users, users_per_block):
+        users = np.arange(first_user, min(first_user + users_per_block, num_users))
+        rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(block,)))
+        yield _user_block(rng, users, counts(users), start, days, recurring)
+        block += 1
+
+def write_transactions(target, num_rows: int, **kwargs) -> int:
+    """
+    Generate transactions straight into ``target`` chunk by chunk.
+
+    ``target`` is a ``FinancialDatabase``, a ``TransactionSnapshot``, a
+    ``.csv`` path (appended to) or a directory path for a new snapshot.
+    Extra keyword arguments go to ``generate_transactions``.
+    """
+    if isinstance(target, (str, os.PathLike)) and not str(target).endswith(".csv"):
+        target = TransactionSnapshot(target)
+    written = 0
+    for chunk in generate_transactions(num_rows, **kwargs):
+        if isinstance(target, FinancialDatabase):
+            target.add_transactions(chunk)
+        elif isinstance(target, TransactionSnapshot):
+            ids = target.manifest["last_id"] + 1 + np.arange(len(chunk))
+            target.append(chunk.assign(id=ids))
+        else:
+            chunk.to_csv(target, mode="a", index=False, header=not os.path.exists(target))
+        written += len(chunk)
+    return written
+
+def generate_sample_transactions(num: int = 200, seed: int = None):
+    frames = list(generate_transactions(num, seed=seed, chunk_size=max(num, 1)))
+    if not frames:
+        return pd.DataFrame(columns=["date", "amount", "category", "description"])
+    return pd.concat(frames, ignore_index=True).drop(columns="user_id")
\ No newline at end of file
@@ -0,0 +1,178 @@
+import json
+import os
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_COLUMNS = ("id", "date", "amount", "category", "description")
+ENCODED_COLUMNS = ("category", "description")
+DTYPES = {"id": "int64", "date": "datetime64[s]", "amount": "float64", "category": "int32", "description": "int32"}
+
+class TransactionSnapshot:
+    """
+    Columnar, memory-mappable snapshot of the transaction history.
+
+    A snapshot is a directory of append-only segments, one ``.npy`` file per
+    column, plus ``manifest.json`` listing the segments and the last exported
+    transaction id. The encoded string columns keep their dictionaries in
+    append-only ``<column>.dict.jsonl`` files, one JSON string per line; the
+    manifest records how many bytes of each are committed, so an append only
+    writes the new entries and the manifest stays small. Reads memory-map the
+    column files, so a single-segment snapshot is loaded without copying into
+    the Python heap; ``compact`` merges segments.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {
+                "version": 2,
+                "segments": [],
+                "last_id": 0,
+                "next_segment": 0,
+                "dictionary_bytes": {column: 0 for column in ENCODED_COLUMNS}
+            }
+        self._dictionaries: Dict[str, List] = {}
+        self._known: Dict[str, set] = {}
+        self._saved: Dict[str, int] = {}  # entries of each dictionary already in its side file
+        # Version 1 kept the dictionaries inline; they move to side files on the next write
+        for column, values in self.manifest.pop("dictionaries", {}).items():
+            self._dictionaries[column] = values
+            self._saved[column] = 0
+        self.manifest.setdefault("dictionary_bytes", {column: 0 for column in ENCODED_COLUMNS})
+        self.manifest["version"] = 2
+
+    @property
+    def rows(self) -> int:
+        return sum(segment["rows"] for segment in self.manifest["segments"])
+
+    def _dictionary_path(self, column: str) -> str:
+        return os.path.join(self.path, f"{column}.dict.jsonl")
+
+    def dictionary(self, column: str) -> List:
+        """The values of an encoded column, indexed by code"""
+        if column not in self._dictionaries:
+            size = self.manifest["dictionary_bytes"][column]
+            values = []
+            if size:
+                # Bytes past the committed size belong to an append that never reached the manifest
+                with open(self._dictionary_path(column), "rb") as f:
+                    values = json.loads(b"[" + f.read(size).rstrip(b"\n").replace(b"\n", b",") + b"]")
+            self._dictionaries[column] = values
+            self._saved[column] = len(values)
+        return self._dictionaries[column]
+
+    def _write_dictionaries(self):
+        for column in ENCODED_COLUMNS:
+            dictionary = self.dictionary(column)
+            new = dictionary[self._saved[column]:]
+            if not new:
+                continue
+            with open(self._dictionary_path(column), "ab") as f:
+                f.truncate(self.manifest["dictionary_bytes"][column])
+                f.write("".join(json.dumps(value) + "\n" for value in new).encode())
+                self.manifest["dictionary_bytes"][column] = f.tell()
+            self._saved[column] = len(dictionary)
+
+    def _write_manifest(self):
+        self._write_dictionaries()
+        # Write-then-rename so readers never see a half-written manifest
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def _encode(self, column: str, values: pd.Series) -> np.ndarray:
+        dictionary = self.dictionary(column)
+        known = self._known.get(column)
+        if known is None or len(known) != len(dictionary):
+            known = self._known[column] = set(dictionary)
+        # Missing values stay out of the dictionary and encode as -1, which decodes back to NaN
+        new = [value for value in pd.unique(values) if not pd.isna(value) and value not in known]
+        dictionary.extend(new)
+        known.update(new)
+        return pd.Categorical(values, categories=dictionary).codes.astype(DTYPES[column])
+
+    def _write_segment(self, arrays: Dict[str, np.ndarray]) -> Dict:
+        name = f"part-{self.manifest['next_segment']:05d}"
+        self.manifest["next_segment"] += 1
+        # A directory already there is an orphan of an append that crashed before its manifest write
+        os.makedirs(os.path.join(self.path, name), exist_ok=True)
+        for column, values in arrays.items():
+            np.save(os.path.join(self.path, name, f"{column}.npy"), values)
+        return {"name": name, "rows": len(arrays["id"])}
+
+    def append(self, frame: pd.DataFrame) -> int:
+        """Append transactions (with their database ids) as a new segment"""
+        if frame.empty:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        arrays = {
+            "id": frame["id"].to_numpy(dtype="int64"),
+            "date": pd.to_datetime(frame["date"]).to_numpy().astype(DTYPES["date"]),
+            "amount": frame["amount"].to_numpy(dtype="float64"),
+        }
+        for column in ENCODED_COLUMNS:
+            arrays[column] = self._encode(column, frame[column].astype(object))
+        self.manifest["segments"].append(self._write_segment(arrays))
+        self.manifest["last_id"] = max(self.manifest["last_id"], int(arrays["id"].max()))
+        self._write_manifest()
+        return len(frame)
+
+    def append_from_db(self, db, chunk_size: int = 1_000_000) -> int:
+        """Export transactions added to ``db`` since the last export; one segment per chunk"""
+        cursor = db.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT id, date, amount, category, description FROM transactions WHERE id > ? ORDER BY id",
+            (self.manifest["last_id"],)
+        )
+        added = 0
+        while rows := cursor.fetchmany(chunk_size):
+            added += self.append(pd.DataFrame.from_records(rows, columns=SNAPSHOT_COLUMNS))
+        return added
+
+    def segments(self, columns=SNAPSHOT_COLUMNS) -> Iterator[Dict[str, np.ndarray]]:
+        """Memory-mapped columns of each segment, in order"""
+        for segment in self.manifest["segments"]:
+            yield {
+                column: np.load(os.path.join(self.path, segment["name"], f"{column}.npy"), mmap_mode="r")
+                for column in columns
+            }
+
+    def columns(self, columns=SNAPSHOT_COLUMNS) -> Dict[str, np.ndarray]:
+        """Whole-history columns; zero-copy for a single segment, concatenated otherwise"""
+        parts = list(self.segments(columns))
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            column: np.concatenate([part[column] for part in parts]) if parts
+            else np.empty(0, dtype=DTYPES[column])
+            for column in columns
+        }
+
+    def to_frame(self, columns=SNAPSHOT_COLUMNS) -> pd.DataFrame:
+        """The history as a DataFrame, with the encoded columns as categoricals"""
+        data = self.columns(columns)
+        for column in ENCODED_COLUMNS:
+            if column in data:
+                data[column] = pd.Categorical.from_codes(data[column], categories=self.dictionary(column))
+        return pd.DataFrame(data, copy=False)
+
+    def compact(self):
+        """Merge all segments into one so reads are zero-copy again"""
+        old: List[Dict] = self.manifest["segments"]
+        if len(old) <= 1:
+            return
+        merged = self.columns()
+        self.manifest["segments"] = [self._write_segment({c: np.asarray(v) for c, v in merged.items()})]
+        self._write_manifest()
+        del merged
+        for segment in old:
+            for column in SNAPSHOT_COLUMNS:
+                os.remove(os.path.join(self.path, segment["name"], f"{column}.npy"))
+            os.rmdir(os.path.join(self.path, segment["name"]))
@@ -1,17 +1,49 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import atexit
+import hashlib
+import re
+from functools import lru_cache
+from .memory_writer import MemoryWriter
 
+@lru_cache(maxsize=None)
 def get_vector_db():
-    embeddings = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-small-en-v1.5",
-        model_kwargs={"device": "cpu"}
+    """The shared Chroma client, backed by the cached embedding service"""
+    from langchain_community.vectorstores import Chroma
+    from .embeddings import get_embeddings
+    return Chroma(
+        persist_directory="./chroma_db",
+        embedding_function=get_embeddings()
     )
+
+def user_collection(user_id) -> str:
+    # Chroma names are 3-63 characters of [a-zA-Z0-9._-] ending in a letter or digit; hash ids that don't fit
+    name = str(user_id)
+    if not re.fullmatch(r"[a-zA-Z0-9_-]{0,47}[a-zA-Z0-9]", name):
+        name = hashlib.sha1(name.encode()).hexdigest()
+    return f"user_{name}"
+
+@lru_cache(maxsize=256)
+def get_user_vector_db(user_id: str):
+    """A user's own memory collection, so searches only scan that user's memories"""
+    from langchain_community.vectorstores import Chroma
+    from .embeddings import get_embeddings
     return Chroma(
+        collection_name=user_collection(user_id),
         persist_directory="./chroma_db",
-        embedding_function=embeddings
+        embedding_function=get_embeddings()
     )
 
-def store_memory(text: str, metadata: dict, vector_db):
+@lru_cache(maxsize=None)
+def get_memory_writer():
+    """The shared background writer; the vector store is only opened on its first flush"""
+    writer = MemoryWriter(get_vector_db, partitions=get_user_vector_db)
+    atexit.register(writer.close)
+    return writer
+
+def store_memory(text: str, metadata: dict, vector_db, writer: MemoryWriter = None):
+    """Write a memory now, or hand it to ``writer`` to be batched in the background"""
+    if writer is not None:
+        writer.enqueue(text, metadata)
+        return
     vector_db.add_texts(
         texts=[text],
         metadatas=[metadata]
@@ -0,0 +1,123 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding model behind a persistent cache keyed by content hash and model name.
+
+    The model is only loaded when a text misses the cache. Cached vectors live
+    in SQLite and are evicted least-recently-used once the cache holds more
+    than ``max_entries`` vectors or ``max_bytes`` of them. Misses are
+    de-duplicated and embedded ``batch_size`` texts at a time.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, cache_path: str = "./embedding_cache.sqlite",
+                 max_entries: int = 200_000, max_bytes: int = 512 * 2**20, batch_size: int = 64):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            vector BLOB,
+            last_used REAL
+        )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._entries, self._bytes = self._db.execute(
+            "SELECT count(*), coalesce(sum(length(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+                self._model = HuggingFaceEmbeddings(
+                    model_name=self.model_name,
+                    model_kwargs={"device": "cpu"}
+                )
+            return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((key, np.frombuffer(vector, dtype=np.float32).tolist()) for key, vector in rows)
+        if found:
+            now = time.time()
+            with self._db:
+                self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()]
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+        self._entries += len(rows)
+        self._bytes += sum(len(blob) for _, blob, _ in rows)
+        if self._entries > self.max_entries or self._bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used vectors until the cache is back to 90% of its limits"""
+        average = self._bytes / max(self._entries, 1)
+        keep = int(min(self.max_entries, self.max_bytes / max(average, 1)) * 0.9)
+        with self._db:
+            self._db.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+            )
+            """, (max(self._entries - keep, 0),))
+        self._entries, self._bytes = self._db.execute(
+            "SELECT count(*), coalesce(sum(length(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            keys = [self._key(text) for text in texts]
+            vectors = self._lookup(list(set(keys)))
+            pending = {key: text for key, text in zip(keys, texts) if key not in vectors}
+            self.hits += len(texts) - sum(key in pending for key in keys)
+            self.misses += len(pending)
+            if pending:
+                items = list(pending.items())
+                for start in range(0, len(items), self.batch_size):
+                    batch = items[start:start + self.batch_size]
+                    embedded = self.model.embed_documents([text for _, text in batch])
+                    new = {key: vector for (key, _), vector in zip(batch, embedded)}
+                    self._store(new)
+                    vectors.update(new)
+            return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+@lru_cache(maxsize=None)
+def get_embeddings(model_name: str = MODEL_NAME) -> CachedEmbeddings:
+    """The process-wide embedding service; the model itself loads on the first cache miss"""
+    return CachedEmbeddings(model_name)
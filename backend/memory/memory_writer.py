@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Tuple, Union
+
+from backend.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class MemoryWriter:
+    """
+    Background writer that batches memories into single ``add_texts`` calls.
+
+    ``enqueue`` journals the memory to SQLite before returning, so queued
+    memories survive a crash and are written after the next start. A
+    background thread flushes the journal whenever ``batch_size`` memories are
+    waiting or ``flush_interval`` seconds have passed. Memories are keyed by a
+    hash of their text, partition and identifying metadata: repeats of a
+    queued or already written memory are dropped, and the key doubles as the
+    vector store id so a replayed batch is not stored twice.
+
+    Memories enqueued with a ``partition`` go to the store that
+    ``partitions(partition)`` returns, one ``add_texts`` call per partition.
+    A partition whose write fails is retried with exponential backoff while
+    the others carry on; after ``max_attempts`` failures the batch is moved
+    to the ``quarantine`` table so it cannot hold the partition up.
+    """
+
+    def __init__(self, vector_db: Union[object, Callable[[], object]],
+                 journal_path: str = "./chroma_db/memory_journal.sqlite",
+                 batch_size: int = 32, flush_interval: float = 2.0,
+                 partitions: Callable[[str], object] = None,
+                 max_attempts: int = 5, max_backoff: float = 300.0):
+        self._vector_db = vector_db
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.quarantined = 0
+        self._failures: Dict[str, Tuple[int, float]] = {}  # partition -> (failed attempts, retry at)
+        self.batches = 0
+        self.written = 0
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(journal_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS pending (
+            key TEXT PRIMARY KEY,
+            text TEXT,
+            metadata TEXT,
+            queued_at REAL,
+            partition TEXT
+        )
+        """)
+        if "partition" not in [row[1] for row in self._db.execute("PRAGMA table_info(pending)")]:
+            self._db.execute("ALTER TABLE pending ADD COLUMN partition TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_pending_partition ON pending (partition, queued_at)")
+        # Every partition ever written to, so maintenance can find them after a restart
+        self._db.execute("CREATE TABLE IF NOT EXISTS partitions (partition TEXT PRIMARY KEY)")
+        self._db.execute("INSERT OR IGNORE INTO partitions SELECT DISTINCT partition FROM pending WHERE partition IS NOT NULL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS written (key TEXT PRIMARY KEY, written_at REAL, partition TEXT)")
+        if "partition" not in [row[1] for row in self._db.execute("PRAGMA table_info(written)")]:
+            self._db.execute("ALTER TABLE written ADD COLUMN partition TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_written_partition ON written (partition)")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS quarantine (
+            key TEXT PRIMARY KEY,
+            text TEXT,
+            metadata TEXT,
+            queued_at REAL,
+            partition TEXT,
+            error TEXT,
+            failed_at REAL
+        )
+        """)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+        if self.pending():
+            self._wake.set()  # replay whatever a previous process left behind
+
+    @property
+    def vector_db(self):
+        if callable(self._vector_db):
+            self._vector_db = self._vector_db()
+        return self._vector_db
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM pending").fetchone()[0]
+
+    def store_for(self, partition: str = None):
+        if partition is None:
+            return self.vector_db
+        if self.partitions is None:
+            raise ValueError("MemoryWriter has no partition resolver")
+        return self.partitions(partition)
+
+    def enqueue(self, text: str, metadata: dict = None, partition: str = None, identity: dict = None) -> bool:
+        """
+        Durably queue a memory; returns False if it duplicates a queued or written one.
+
+        The duplicate check covers the text, the partition and ``identity``
+        (default: all of ``metadata``), so volatile fields such as timestamps
+        can be stored without making every memory unique.
+        """
+        if self._closed:
+            raise RuntimeError("MemoryWriter is closed")
+        metadata = metadata or {}
+        key = hashlib.sha256(
+            json.dumps([text, metadata if identity is None else identity, partition],
+                       sort_keys=True, default=str).encode()
+        ).hexdigest()
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM written WHERE key = ?", (key,)).fetchone():
+                return False
+            added = self._db.execute(
+                "INSERT OR IGNORE INTO pending (key, text, metadata, queued_at, partition) VALUES (?, ?, ?, ?, ?)",
+                (key, text, json.dumps(metadata, default=str), time.time(), partition)
+            ).rowcount
+            if partition is not None:
+                self._db.execute("INSERT OR IGNORE INTO partitions VALUES (?)", (partition,))
+            waiting = self._db.execute(
+                "SELECT count(*) FROM pending WHERE partition IS ?", (partition,)
+            ).fetchone()[0]
+        if waiting >= self.batch_size:
+            self._wake.set()
+        return bool(added)
+
+    def known_partitions(self) -> list:
+        """Every partition a memory has been queued for, including in earlier processes"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT partition FROM partitions ORDER BY partition")]
+
+    def _next_partition(self, partial: bool):
+        """
+        The partition to write next, oldest first: any with ``partial``, else a
+        full or overdue one. Partitions backing off after a failure are skipped.
+        """
+        now = time.time()
+        overdue = now - self.flush_interval
+        for partition, waiting, oldest in self._db.execute(
+            "SELECT partition, count(*), min(queued_at) FROM pending GROUP BY partition ORDER BY min(queued_at)"
+        ):
+            if partition in self._failures and self._failures[partition][1] > now:
+                continue
+            if partial or waiting >= self.batch_size or oldest <= overdue:
+                return (partition,)
+        return None
+
+    def flush(self, partial: bool = True) -> int:
+        """
+        Write everything queued so far; returns the number of memories written.
+
+        With ``partial=False`` only partitions holding a full batch, or whose
+        oldest memory has waited ``flush_interval``, are written.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    head = self._next_partition(partial)
+                    if head is None:
+                        return written
+                    rows = self._db.execute(
+                        "SELECT key, text, metadata FROM pending WHERE partition IS ? ORDER BY queued_at LIMIT ?",
+                        (head[0], self.batch_size)
+                    ).fetchall()
+                keys = [key for key, _, _ in rows]
+                try:
+                    with span("memory.write", partition=head[0], size=len(rows)):
+                        self.store_for(head[0]).add_texts(
+                            texts=[text for _, text, _ in rows],
+                            metadatas=[json.loads(metadata) for _, _, metadata in rows],
+                            ids=keys
+                        )
+                except Exception as error:
+                    self._failed(head[0], keys, error)
+                    continue
+                self._failures.pop(head[0], None)
+                now = time.time()
+                with self._lock:
+                    self._db.execute("BEGIN")
+                    self._db.executemany("DELETE FROM pending WHERE key = ?", [(key,) for key in keys])
+                    self._db.executemany("INSERT OR REPLACE INTO written VALUES (?, ?, ?)",
+                                         [(key, now, head[0]) for key in keys])
+                    self._db.execute("COMMIT")
+                self.batches += 1
+                self.written += len(rows)
+                written += len(rows)
+
+    def _failed(self, partition: str, keys: list, error: Exception):
+        """Back the partition off, or quarantine the batch once it has failed ``max_attempts`` times"""
+        attempts = self._failures.get(partition, (0, 0.0))[0] + 1
+        logger.exception("Writing %d memories to partition %r failed (attempt %d of %d)",
+                         len(keys), partition, attempts, self.max_attempts)
+        if attempts < self.max_attempts:
+            delay = min(self.flush_interval * 2 ** attempts, self.max_backoff)
+            self._failures[partition] = (attempts, time.time() + delay)
+            return
+        self._failures.pop(partition, None)
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO quarantine "
+                "SELECT key, text, metadata, queued_at, partition, ?, ? FROM pending WHERE key = ?",
+                [(f"{type(error).__name__}: {error}", now, key) for key in keys]
+            )
+            self._db.executemany("DELETE FROM pending WHERE key = ?", [(key,) for key in keys])
+            self._db.execute("COMMIT")
+        self.quarantined += len(keys)
+
+    def forget(self, keys):
+        """Let memories deleted from the vector store be queued again"""
+        keys = list(keys)
+        with self._lock:
+            self._db.executemany("DELETE FROM written WHERE key = ?", [(key,) for key in keys])
+
+    def retain(self, partition: str, keys, before: float) -> int:
+        """Forget ``partition``'s memories written before ``before`` that are not among ``keys``"""
+        keep = set(keys)
+        with self._lock:
+            gone = [
+                (key,) for (key,) in self._db.execute(
+                    "SELECT key FROM written WHERE partition IS ? AND written_at < ?", (partition, before)
+                ) if key not in keep
+            ]
+            self._db.executemany("DELETE FROM written WHERE key = ?", gone)
+        return len(gone)
+
+    def _run(self):
+        while not self._closed:
+            # Woken early when a partition fills up; either way write the full and the overdue partitions
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush(partial=self._closed)
+            except Exception:
+                # Memories stay journaled and are retried on the next round
+                logger.exception("Flushing memories to the vector store failed")
+
+    def close(self):
+        """Stop the background thread after a final flush"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._db.close()
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+from pydantic import BaseModel
+
+from backend.tracing import traced
+from .chorma_setup import get_memory_writer, get_user_vector_db
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+
+class MemoryPolicy(BaseModel):
+    ttl_days: float = 90  # memories older than this expire...
+    keep_importance: float = 0.9  # ...unless at least this important
+    max_memories: int = 1000  # per user; the lowest scoring are dropped beyond it
+    half_life_days: float = 30  # how fast a memory's score decays with age
+    compact_after_days: float = 30  # older memories get folded into summaries
+    compact_batch: int = 20  # memories per summary
+
+def _summarize(texts: List[str]) -> str:
+    # Extractive fallback: the first line of every memory, oldest first
+    return "\n".join(f"- {text.strip().splitlines()[0][:200]}" for text in texts if text.strip())
+
+class UserMemory:
+    """
+    Per-user memory lifecycle on top of the partitioned vector store.
+
+    Each user's memories live in their own collection, so a search only scans
+    that user's memories. ``maintain`` keeps a collection bounded: expired
+    memories are dropped, old ones are compacted into summaries, and the
+    lowest scoring (importance decayed by age) go once the user holds more
+    than ``max_memories``. Writes go through the shared background writer.
+    """
+
+    def __init__(self, policy: MemoryPolicy = None, vector_db: Callable[[str], object] = get_user_vector_db,
+                 writer=None, summarize: Callable[[List[str]], str] = _summarize):
+        self.policy = policy or MemoryPolicy()
+        self.vector_db = vector_db
+        self.writer = writer or get_memory_writer()
+        self.summarize = summarize
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def users(self) -> List[str]:
+        # The writer journals every partition it has seen, so this survives restarts
+        return self.writer.known_partitions()
+
+    def remember(self, user_id: str, text: str, metadata: dict = None, importance: float = 0.5) -> bool:
+        """Queue a memory for ``user_id``; returns False if the user already holds it"""
+        identity = dict(metadata or {})
+        metadata = dict(identity, user_id=str(user_id), importance=float(importance), created_at=time.time())
+        # Keyed without the timestamp, so remembering the same thing twice stores it once
+        return self.writer.enqueue(text, metadata, partition=str(user_id), identity=identity)
+
+    def recall(self, user_id: str, query: str, k: int = 4):
+        """Most similar live memories for ``user_id``"""
+        cutoff = time.time() - self.policy.ttl_days * DAY
+        live = {"$or": [{"created_at": {"$gte": cutoff}}, {"importance": {"$gte": self.policy.keep_importance}}]}
+        return self.vector_db(str(user_id)).similarity_search(query, k=k, filter=live)
+
+    def _score(self, metadata: dict, now: float) -> float:
+        age = (now - metadata.get("created_at", now)) / DAY
+        return metadata.get("importance", 0.5) * 0.5 ** (age / self.policy.half_life_days)
+
+    def _delete(self, store, ids: List[str]):
+        if ids:
+            store.delete(ids=ids)
+            self.writer.forget(ids)
+
+    def evict(self, user_id: str, now: float = None) -> int:
+        """Drop expired memories, then the lowest scoring beyond ``max_memories``"""
+        now = now or time.time()
+        store = self.vector_db(str(user_id))
+        listed_at = time.time()
+        found = store.get(include=["metadatas"])
+        # Memories that left the store some other way no longer block being remembered again
+        self.writer.retain(str(user_id), found["ids"], listed_at)
+        memories = dict(zip(found["ids"], found["metadatas"]))
+        expired = [
+            id_ for id_, metadata in memories.items()
+            if now - metadata.get("created_at", now) > self.policy.ttl_days * DAY
+            and metadata.get("importance", 0.5) < self.policy.keep_importance
+        ]
+        for id_ in expired:
+            del memories[id_]
+        excess = len(memories) - self.policy.max_memories
+        if excess > 0:
+            expired += sorted(memories, key=lambda id_: self._score(memories[id_], now))[:excess]
+        self._delete(store, expired)
+        return len(expired)
+
+    def compact(self, user_id: str, now: float = None) -> int:
+        """Fold old memories into summaries, ``compact_batch`` at a time; returns the memories folded"""
+        now = now or time.time()
+        store = self.vector_db(str(user_id))
+        found = store.get(
+            where={"created_at": {"$lt": now - self.policy.compact_after_days * DAY}},
+            include=["documents", "metadatas"]
+        )
+        old = sorted(
+            (item for item in zip(found["ids"], found["documents"], found["metadatas"])
+             if item[2].get("type") != "summary"),
+            key=lambda item: item[2].get("created_at", 0)
+        )
+        folded = 0
+        # A short remainder waits until it fills a batch
+        for start in range(0, len(old) - self.policy.compact_batch + 1, self.policy.compact_batch):
+            batch = old[start:start + self.policy.compact_batch]
+            metadata = {
+                "type": "summary",
+                "user_id": str(user_id),
+                "importance": max(m.get("importance", 0.5) for _, _, m in batch),
+                "created_at": max(m.get("created_at", now) for _, _, m in batch),
+                "sources": len(batch)
+            }
+            # Written directly: the originals must not be deleted before their summary exists
+            store.add_texts(texts=[self.summarize([text for _, text, _ in batch])], metadatas=[metadata])
+            self._delete(store, [id_ for id_, _, _ in batch])
+            folded += len(batch)
+        return folded
+
+    @traced()
+    def maintain(self, user_id: str = None) -> Dict[str, dict]:
+        """Compact, then evict, for one user or every user that has memories"""
+        report = {}
+        with self._lock:
+            for user in [str(user_id)] if user_id is not None else sorted(self.users):
+                report[user] = {"compacted": self.compact(user), "evicted": self.evict(user)}
+        return report
+
+    def start(self, interval: float = 3600.0):
+        """Run ``maintain`` for all users every ``interval`` seconds in a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.writer.flush()
+                    self.maintain()
+                except Exception:
+                    logger.exception("Memory maintenance failed")
+
+        self._thread = threading.Thread(target=run, name="memory-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+@lru_cache(maxsize=None)
+def get_user_memory() -> UserMemory:
+    """The shared per-user memory, with hourly maintenance running in the background"""
+    memory = UserMemory()
+    memory.start()
+    return memory
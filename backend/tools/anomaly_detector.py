@@ -0,0 +1,85 @@
+import json
+import math
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+class SpendAnomalyDetector:
+    """
+    Streaming per-category spend anomaly detector.
+
+    Keeps an exponentially weighted mean and variance of each category's
+    amounts plus a multiplicative factor per weekday, so every transaction is
+    scored and absorbed in O(1) without looking at history.
+    """
+
+    def __init__(self, alpha: float = 0.05, seasonal_alpha: float = 0.1,
+                 threshold: float = 3.0, warmup: int = 10, history: int = 100):
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.categories: Dict[str, dict] = {}
+        self.anomalies = deque(maxlen=history)
+
+    def observe(self, transaction: Dict) -> Optional[Dict]:
+        """Score one transaction, fold it into the statistics and return it if it is anomalous"""
+        amount = float(transaction["amount"])
+        weekday = datetime.fromisoformat(str(transaction["date"])).weekday()
+        stats = self.categories.setdefault(
+            transaction["category"], {"count": 0, "mean": 0.0, "var": 0.0, "weekday": [1.0] * 7}
+        )
+        season = stats["weekday"][weekday]
+
+        anomaly = None
+        if stats["count"] >= self.warmup:
+            expected = stats["mean"] * season
+            std = math.sqrt(stats["var"]) * season
+            score = (amount - expected) / std if std > 0 else 0.0
+            if abs(score) >= self.threshold:
+                anomaly = {**transaction, "expected": expected, "score": score}
+                self.anomalies.append(anomaly)
+
+        # Deseasonalise before updating the level so weekday swings don't inflate the variance
+        level = amount / season
+        if stats["count"] == 0:
+            stats["mean"] = level
+        else:
+            delta = level - stats["mean"]
+            stats["mean"] += self.alpha * delta
+            stats["var"] = (1 - self.alpha) * (stats["var"] + self.alpha * delta ** 2)
+        if stats["mean"] > 0:
+            ratio = amount / stats["mean"]
+            stats["weekday"][weekday] += self.seasonal_alpha * (ratio - season)
+            # Keep the factors averaging 1 so the level, not the factors, carries the scale
+            scale = sum(stats["weekday"]) / 7
+            if scale > 0:
+                stats["weekday"] = [factor / scale for factor in stats["weekday"]]
+                stats["mean"] *= scale
+                stats["var"] *= scale ** 2
+        stats["count"] += 1
+        return anomaly
+
+    def state_dict(self) -> Dict:
+        return {
+            "alpha": self.alpha,
+            "seasonal_alpha": self.seasonal_alpha,
+            "threshold": self.threshold,
+            "warmup": self.warmup,
+            "categories": self.categories
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "SpendAnomalyDetector":
+        detector = cls(state["alpha"], state["seasonal_alpha"], state["threshold"], state["warmup"])
+        detector.categories = state["categories"]
+        return detector
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.state_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "SpendAnomalyDetector":
+        with open(path) as f:
+            return cls.from_state(json.load(f))
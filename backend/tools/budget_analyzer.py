@@ -1,16 +1,57 @@
+import numpy as np
 import pandas as pd
+from backend.tracing import traced
 
 class BudgetAnalyzer:
-    def analyze(self, transactions: pd.DataFrame, budget: dict):
-        monthly = transactions.groupby(['month', 'category'])['amount'].sum().unstack()
-        deviations = {}
-        for month in monthly.index:
-            deviations[month] = {
-                cat: {
-                    'spent': monthly.loc[month, cat],
-                    'budgeted': budget.get(cat, 0),
-                    'deviation': monthly.loc[month, cat] - budget.get(cat, 0)
-                }
-                for cat in budget.keys()
-            }
-        return deviations
\ No newline at end of file
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Drop the running month x category totals"""
+        self.monthly = pd.Series(
+            dtype=float,
+            index=pd.MultiIndex.from_arrays([[], []], names=['month', 'category']),
+            name='amount'
+        )
+
+    @traced()
+    def update(self, transactions):
+        """
+        Fold new transactions into the running totals; costs O(new rows).
+
+        Accepts a DataFrame or an iterable of DataFrame chunks, such as
+        ``FinancialDatabase.iter_transaction_frames()``.
+        """
+        if not isinstance(transactions, pd.DataFrame):
+            for chunk in transactions:
+                self.update(chunk)
+            return
+        if 'month' in transactions:
+            month = transactions['month'].astype(str)
+        else:
+            month = pd.to_datetime(transactions['date']).to_numpy().astype('datetime64[M]').astype(str)
+        new = transactions['amount'].groupby(
+            [np.asarray(month), np.asarray(transactions['category'], dtype=object)]
+        ).sum()
+        new.index.names = ['month', 'category']
+        self.monthly = self.monthly.add(new, fill_value=0).rename('amount')
+
+    def load_summary(self, summary):
+        """Replace the running totals with rollup rows (month, category, total), e.g. from the database"""
+        summary = pd.DataFrame(summary, columns=['month', 'category', 'total'])
+        self.monthly = summary.set_index(['month', 'category'])['total'].astype(float).rename('amount')
+
+    def deviations(self, budget: dict) -> pd.DataFrame:
+        """Spent, budgeted and deviation per month for every budgeted category"""
+        months = self.monthly.index.get_level_values('month').unique().sort_values()
+        index = pd.MultiIndex.from_product([months, list(budget)], names=['month', 'category'])
+        report = self.monthly.reindex(index, fill_value=0).rename('spent').reset_index()
+        report['budgeted'] = np.tile(np.array(list(budget.values()), dtype=float), len(months))
+        report['deviation'] = report['spent'] - report['budgeted']
+        return report
+
+    @traced()
+    def analyze(self, transactions, budget: dict) -> pd.DataFrame:
+        self.reset()
+        self.update(transactions)
+        return self.deviations(budget)
\ No newline at end of file
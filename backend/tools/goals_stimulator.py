@@ -1,16 +1,248 @@
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
 import numpy as np
+import pandas as pd
+from .sip_calculator import SIPCalculator
+from backend.tracing import traced
+
+def _simulate_horizon(task):
+    """Worker for ``GoalSimulator.simulate_many``: every goal in a task shares one horizon and one set of draws"""
+    years, rate_groups, n_paths, entropy, volatility, chunk_bytes = task
+    months = years * 12
+    # The stream depends only on the root entropy and the horizon, so every task
+    # for this horizon sees the same draws no matter how the work was split up.
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(years,)))
+    unit = np.zeros((len(rate_groups), n_paths))
+    chunk = max(1, chunk_bytes // (max(months, 1) * 8))
+    for start in range(0, n_paths if months else 0, chunk):
+        size = min(chunk, n_paths - start)
+        shocks = rng.standard_normal((size, months))
+        shocks *= volatility
+        for i, (rate, _) in enumerate(rate_groups):
+            growth = shocks + (1 + rate / 12)
+            np.cumprod(growth, axis=1, out=growth)
+            unit[i, start:start + size] = growth.sum(axis=1)
+    rows = []
+    for i, (_, goals) in enumerate(rate_groups):
+        for index, target, monthly in goals:
+            balances = monthly * unit[i]
+            p10, p50, p90 = np.percentile(balances, [10, 50, 90])
+            rows.append((index, np.count_nonzero(balances >= target) / n_paths, p10, p50, p90))
+    return rows
 
 class GoalSimulator:
-    def simulate(self, target: float, monthly: float, years: int, return_rate: float):
-        simulations = []
-        for _ in range(1000):  # Monte Carlo
-            balance = 0
-            for _ in range(years * 12):
-                balance += monthly
-                balance *= (1 + np.random.normal(return_rate/12, 0.02))
-            simulations.append(balance)
-        success_rate = sum(np.array(simulations) >= target) / 1000
+    def __init__(self, volatility: float = 0.02, seed: int = None, chunk_bytes: int = 64 * 2**20,
+                 path_cache_bytes: int = 256 * 2**20):
+        self.volatility = volatility
+        self.seed = seed
+        self.chunk_bytes = chunk_bytes  # RAM budget for one block of monthly returns
+        self.path_cache_bytes = path_cache_bytes  # RAM budget for all cached asset paths together
+        self._path_cache = OrderedDict()
+        self._path_cache_used = 0
+
+    def _chunk_paths(self, months: int, assets: int = 1) -> int:
+        return max(1, self.chunk_bytes // (max(months, 1) * assets * 8))
+
+    def _terminal_balances(self, monthly: float, months: int, return_rate: float,
+                           n_paths: int, rng: np.random.Generator):
+        """Yield terminal balances for ``n_paths`` paths, one memory-bounded chunk at a time"""
+        chunk = self._chunk_paths(months)
+        for start in range(0, n_paths, chunk):
+            size = min(chunk, n_paths - start)
+            if months == 0:
+                yield np.zeros(size)
+                continue
+            # Column k holds the growth factor applied k months before the end,
+            # so the cumulative product along a row is how much the deposit made
+            # in that month has grown by the horizon.
+            growth = rng.standard_normal((size, months))
+            growth *= self.volatility
+            growth += 1 + return_rate / 12
+            np.cumprod(growth, axis=1, out=growth)
+            yield monthly * growth.sum(axis=1)
+
+    @traced()
+    def simulate(self, target: float, monthly: float, years: int, return_rate: float,
+                 n_paths: int = 1000, seed: int = None):
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        simulations = np.concatenate(list(
+            self._terminal_balances(monthly, years * 12, return_rate, n_paths, rng)
+        ))
+        success_rate = np.count_nonzero(simulations >= target) / n_paths
         return {
             "success_rate": success_rate,
             "percentiles": np.percentile(simulations, [10, 50, 90]).tolist()
-        }
\ No newline at end of file
+        }
+
+    @traced()
+    def simulate_adaptive(self, target: float, monthly: float, years: int, return_rate: float,
+                          tolerance: float = 0.01, percentile_tolerance: float = 0.05,
+                          confidence: float = 0.95, batch_size: int = 1000,
+                          max_paths: int = 100_000, time_budget: float = 2.0, seed: int = None):
+        """
+        Simulate in batches until the confidence intervals are tight enough.
+
+        ``tolerance`` bounds the half-width of the Wilson interval on the success
+        rate; ``percentile_tolerance`` bounds the order-statistic interval of each
+        percentile, relative to its value. Stops early at ``max_paths`` paths or
+        after ``time_budget`` seconds, whichever comes first.
+        """
+        if batch_size < 1 or max_paths < 1:
+            raise ValueError(f"batch_size and max_paths must be at least 1, got {batch_size} and {max_paths}")
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        quantiles = np.array([0.10, 0.50, 0.90])
+        simulations = np.empty(max_paths)
+        n = 0
+        started = time.perf_counter()
+        while True:
+            size = min(batch_size, max_paths - n)
+            for balances in self._terminal_balances(monthly, years * 12, return_rate, size, rng):
+                simulations[n:n + len(balances)] = balances
+                n += len(balances)
+            ordered = np.sort(simulations[:n])
+            p = np.count_nonzero(ordered >= target) / n
+            rate_width = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+            percentiles = np.percentile(ordered, quantiles * 100)
+            spread = z * np.sqrt(n * quantiles * (1 - quantiles))
+            lo = np.clip(np.floor(n * quantiles - spread).astype(int), 0, n - 1)
+            hi = np.clip(np.ceil(n * quantiles + spread).astype(int), 0, n - 1)
+            half_widths = (ordered[hi] - ordered[lo]) / 2
+            scale = np.abs(percentiles)
+            percentile_widths = np.divide(half_widths, scale, out=np.zeros_like(half_widths), where=scale > 0)
+            converged = bool(rate_width <= tolerance) and bool(np.all(percentile_widths <= percentile_tolerance))
+            if converged or n >= max_paths or time.perf_counter() - started >= time_budget:
+                break
+        return {
+            "success_rate": p,
+            "percentiles": percentiles.tolist(),
+            "paths": n,
+            "converged": converged,
+            "precision": {
+                "success_rate": float(rate_width),
+                "percentiles": percentile_widths.tolist()
+            }
+        }
+
+    @traced(size=len)
+    def simulate_many(self, goals, n_paths: int = 1000, seed: int = None, workers: int = None) -> pd.DataFrame:
+        """
+        Simulate a table of goals (target, monthly, years, return_rate) over a process pool.
+
+        Goals with the same horizon are simulated against the same standard normal
+        draws (common random numbers); each goal's own estimate is unaffected,
+        only the errors between those goals become correlated. Every horizon gets
+        an independent stream spawned from ``seed``, so results do not depend on
+        the number of workers.
+        """
+        goals = pd.DataFrame(goals)
+        workers = workers or os.cpu_count() or 1
+        entropy = np.random.SeedSequence(self.seed if seed is None else seed).entropy
+
+        horizons = {}
+        for index, target, monthly, years, rate in zip(
+            goals.index, goals["target"], goals["monthly"], goals["years"], goals["return_rate"]
+        ):
+            horizons.setdefault(int(years), {}).setdefault(float(rate), []).append(
+                (index, float(target), float(monthly))
+            )
+        # Split horizons into enough tasks to keep every worker busy.
+        n_groups = sum(len(rates) for rates in horizons.values())
+        per_task = max(1, -(-n_groups // (workers * 4)))
+        tasks = []
+        for years, rates in horizons.items():
+            groups = list(rates.items())
+            for start in range(0, len(groups), per_task):
+                tasks.append((years, groups[start:start + per_task], n_paths,
+                              entropy, self.volatility, self.chunk_bytes))
+
+        if workers == 1 or len(tasks) <= 1:
+            results = map(_simulate_horizon, tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_simulate_horizon, tasks))
+        rows = [row for task_rows in results for row in task_rows]
+        stats = pd.DataFrame(
+            rows, columns=["index", "success_rate", "p10", "p50", "p90"]
+        ).set_index("index")
+        return goals.join(stats)
+
+    def asset_paths(self, years: int, assets, covariance, expected_returns: dict = None,
+                    n_paths: int = 1000, seed: int = None) -> np.ndarray:
+        """
+        Correlated monthly growth factors, shaped (months, paths, assets).
+
+        ``covariance`` is the annual covariance of the asset returns, either a
+        DataFrame labelled by asset or an array in the order of ``assets``.
+        Draws are cached per (horizon, covariance, seed), so re-weighting a mix
+        reuses them; unseeded draws are never cached, and the least recently
+        used are dropped beyond ``path_cache_bytes``. A draw larger than
+        ``chunk_bytes`` raises ValueError: ``simulate_portfolio`` draws in chunks.
+        """
+        assets = tuple(assets)
+        seed = self.seed if seed is None else seed
+        if isinstance(covariance, pd.DataFrame):
+            covariance = covariance.loc[list(assets), list(assets)]
+        covariance = np.asarray(covariance, dtype=float)
+        expected_returns = expected_returns or SIPCalculator().historical_returns
+        mean = np.array([expected_returns[asset] for asset in assets], dtype=float)
+        months = years * 12
+        if n_paths > self._chunk_paths(months, len(assets)):
+            raise ValueError(
+                f"{n_paths} paths of {months} months for {len(assets)} assets exceed chunk_bytes "
+                f"({self.chunk_bytes} bytes)"
+            )
+
+        key = (months, n_paths, assets, mean.tobytes(), covariance.tobytes(), seed)
+        if seed is not None and key in self._path_cache:
+            self._path_cache.move_to_end(key)
+            return self._path_cache[key]
+
+        rng = np.random.default_rng(seed)
+        chol = np.linalg.cholesky(covariance / 12)
+        growth = rng.standard_normal((months, n_paths, len(assets))) @ chol.T
+        growth += 1 + mean / 12
+        growth.flags.writeable = False
+        if seed is not None and growth.nbytes <= self.path_cache_bytes:
+            self._path_cache[key] = growth
+            self._path_cache_used += growth.nbytes
+            while self._path_cache_used > self.path_cache_bytes:
+                self._path_cache_used -= self._path_cache.popitem(last=False)[1].nbytes
+        return growth
+
+    @traced()
+    def simulate_portfolio(self, target: float, monthly: float, years: int, asset_mix: dict,
+                           covariance, expected_returns: dict = None, rebalance_months: int = 12,
+                           n_paths: int = 1000, seed: int = None):
+        """
+        Monte Carlo over correlated asset classes, weighted by ``asset_mix``.
+
+        Each month's contribution is split by the (normalised) weights and the
+        holdings are reset to those weights every ``rebalance_months`` months;
+        pass 0 to never rebalance. Paths are drawn ``chunk_bytes`` at a time.
+        """
+        seed = self.seed if seed is None else seed
+        weights = np.array(list(asset_mix.values()), dtype=float)
+        weights /= weights.sum()
+        deposit = monthly * weights
+        chunk = self._chunk_paths(years * 12, len(weights))
+        simulations = np.empty(n_paths)
+        for start in range(0, n_paths, chunk):
+            size = min(chunk, n_paths - start)
+            # One chunk keeps the plain seed so it shares draws with asset_paths(seed=seed)
+            chunk_seed = seed if seed is None or size == n_paths else (seed, start)
+            growth = self.asset_paths(years, asset_mix.keys(), covariance, expected_returns, size, chunk_seed)
+            holdings = np.zeros((size, len(weights)))
+            for month in range(years * 12):
+                holdings += deposit
+                holdings *= growth[month]
+                if rebalance_months and (month + 1) % rebalance_months == 0:
+                    holdings = holdings.sum(axis=1, keepdims=True) * weights
+            simulations[start:start + size] = holdings.sum(axis=1)
+        return {
+            "success_rate": np.count_nonzero(simulations >= target) / n_paths,
+            "percentiles": np.percentile(simulations, [10, 50, 90]).tolist()
+        }
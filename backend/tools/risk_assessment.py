@@ -1,6 +1,7 @@
 import numpy as np
 from typing import Dict, List
 from pydantic import BaseModel
+from backend.tracing import traced
 
 class RiskProfile(BaseModel):
     volatility: float  # 0-1
@@ -17,6 +18,7 @@ class RiskAssessor:
             'aggressive': [80, 30, 70, 80, 30]
         }
     
+    @traced()
     def calculate_risk_score(self, profile: RiskProfile) -> Dict:
         weights = np.array([0.3, 0.2, 0.15, 0.2, 0.15])  # Weighted factors
         profile_array = np.array([
@@ -50,6 +52,7 @@ class RiskAssessor:
             "benchmarks": self.benchmarks
         }
     
+    @traced()
     def portfolio_risk_analysis(self, holdings: Dict[str, float]) -> Dict:
         """Analyze portfolio concentration risk"""
         holdings_values = np.array(list(holdings.values()))
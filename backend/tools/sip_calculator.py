@@ -1,24 +1,106 @@
 import pandas as pd
 import numpy as np
+from backend.tracing import traced
+
+def project_sip(amount, years, rate, step_up=0.0, schedule: bool = False) -> dict:
+    """
+    Vectorised SIP projection; every argument broadcasts against the others.
+
+    ``rate`` is the expected annual return and ``step_up`` the annual increase
+    of the monthly amount, both as fractions. Deposits are made at the end of
+    each month. With ``schedule=True`` the month-by-month corpus is returned
+    as an array of shape (*scenarios, max_months), NaN past each horizon.
+    """
+    amount, years, rate, step_up = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (amount, years, rate, step_up))
+    )
+    monthly_rate = rate / 12
+    flat = monthly_rate == 0
+    # Year-end value of twelve unit deposits, and the yearly growth of the corpus
+    year_value = np.where(flat, 12.0, ((1 + monthly_rate)**12 - 1) / np.where(flat, 1, monthly_rate))
+    q = (1 + monthly_rate)**12
+    g = 1 + step_up
+    # sum over deposit years y of g**y * q**(years - 1 - y)
+    same = np.isclose(q, g)
+    growth = np.where(same, years * q**(years - 1), (q**years - g**years) / np.where(same, 1, q - g))
+    no_step = step_up == 0
+    deposits = np.where(no_step, years, (g**years - 1) / np.where(no_step, 1, step_up))
+
+    future_value = amount * year_value * growth
+    total_invested = amount * 12 * deposits
+    result = {
+        "total_invested": total_invested,
+        "future_value": future_value,
+        # Every deposit compounds at the same monthly rate, so that rate is the exact IRR
+        "xirr": (1 + monthly_rate)**12 - 1
+    }
+    if schedule:
+        months = (years * 12).astype(int).ravel()
+        t = np.arange(months.max() if months.size else 0)
+        r = monthly_rate.reshape(-1, 1)
+        active = t < months[:, None]
+        contributions = np.where(active, amount.reshape(-1, 1) * g.reshape(-1, 1)**(t // 12), 0.0)
+        corpus = (1 + r)**t * np.cumsum(contributions * (1 + r)**-t, axis=1)
+        corpus[~active] = np.nan
+        result["schedule"] = corpus.reshape(amount.shape + t.shape)
+    return result
 
 class SIPCalculator:
     def __init__(self):
         self.historical_returns = {
-            'equity': 0.12, 
+            'equity': 0.12,
             'debt': 0.07,
             'hybrid': 0.09
         }
-    
-    def project(self, amount: float, years: int, asset_mix: dict):
+
+    def blended_returns(self, asset_mixes) -> np.ndarray:
+        """Weighted historical return of each asset mix in ``asset_mixes``"""
+        assets = list(self.historical_returns)
+        weights = np.array([[mix.get(asset, 0) for asset in assets] for mix in asset_mixes], dtype=float)
+        return weights @ np.array([self.historical_returns[asset] for asset in assets])
+
+    @traced()
+    def project(self, amount: float, years: int, asset_mix: dict, step_up: float = 0.0):
         weighted_return = sum(
-            self.historical_returns[asset] * weight 
+            self.historical_returns[asset] * weight
             for asset, weight in asset_mix.items()
         )
-        months = years * 12
-        monthly_rate = weighted_return / 12
-        future_value = amount * (((1 + monthly_rate)**months - 1) / monthly_rate)
-        return {
-            "total_invested": amount * months,
-            "future_value": future_value,
-            "xirr": ((future_value / (amount * months)) ** (1/years)) - 1
-        }
\ No newline at end of file
+        projection = project_sip(amount, years, weighted_return, step_up)
+        return {key: float(value) for key, value in projection.items()}
+
+    @traced()
+    def project_grid(self, amounts, years, rates=None, asset_mixes=None, step_ups=(0.0,),
+                     grid: bool = True, schedule: bool = False):
+        """
+        Project many scenarios in one vectorised call.
+
+        With ``grid=True`` every combination of the inputs is projected; with
+        ``grid=False`` the inputs are zipped and must have equal lengths.
+        Rates are given either directly or as ``asset_mixes`` (a list of dicts,
+        reported by position in the ``mix`` column). With ``schedule=True`` a
+        (frame, schedule) tuple is returned, the schedule rows aligned with the
+        frame.
+        """
+        if asset_mixes is not None:
+            rates = self.blended_returns(asset_mixes)
+            mixes = np.arange(len(asset_mixes))
+        else:
+            rates = np.atleast_1d(np.asarray(rates, dtype=float))
+            mixes = None
+        columns = {"amount": amounts, "years": years, "rate": rates, "step_up": step_ups}
+        if grid:
+            values = [np.atleast_1d(np.asarray(v)) for v in columns.values()]
+            codes = np.indices([len(v) for v in values]).reshape(len(values), -1)
+            frame = pd.DataFrame({name: v[c] for name, v, c in zip(columns, values, codes)})
+            if mixes is not None:
+                frame.insert(3, "mix", mixes[codes[2]])
+        else:
+            frame = pd.DataFrame({name: np.broadcast_to(values, np.shape(amounts)) for name, values in columns.items()})
+            if mixes is not None:
+                frame.insert(3, "mix", mixes)
+        projection = project_sip(frame["amount"], frame["years"], frame["rate"], frame["step_up"], schedule)
+        for key in ("total_invested", "future_value", "xirr"):
+            frame[key] = projection[key]
+        if schedule:
+            return frame, projection["schedule"]
+        return frame
\ No newline at end of file
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from backend.tracing import traced
+
+def _pad(dates, amounts):
+    """Pack ragged cashflow series into padded (series, flows) arrays plus a validity mask"""
+    lengths = np.array([len(series) for series in amounts])
+    width = lengths.max() if lengths.size else 0
+    mask = np.arange(width) < lengths[:, None]
+    padded_dates = np.zeros(mask.shape, dtype="datetime64[D]")
+    padded_amounts = np.zeros(mask.shape)
+    padded_dates[mask] = np.concatenate([np.asarray(d, dtype="datetime64[D]") for d in dates]) if width else []
+    padded_amounts[mask] = np.concatenate([np.asarray(a, dtype=float) for a in amounts]) if width else []
+    return padded_dates, padded_amounts, mask
+
+def _npv(rate, times, amounts):
+    discount = (1 + rate[:, None]) ** -times
+    npv = (amounts * discount).sum(axis=1)
+    slope = (-times * amounts * discount).sum(axis=1) / (1 + rate)
+    return npv, slope
+
+@traced()
+def xirr_many(dates, amounts, mask=None, guess: float = 0.1, tol: float = 1e-9,
+              max_iter: int = 50, bounds=(-0.9999, 100.0)) -> np.ndarray:
+    """
+    Annualised XIRR of many dated cashflow series at once.
+
+    Takes either lists of per-series dates and amounts, or padded 2-D arrays
+    with a boolean ``mask`` of valid flows. Amounts are signed from the
+    investor's side: contributions negative, withdrawals and terminal value
+    positive. Newton's method runs on all series together; series it fails
+    to converge are bracketed on a rate grid and bisected. Series without
+    both inflows and outflows, or without a root in ``bounds``, get NaN.
+    """
+    if mask is None:
+        dates, amounts, mask = _pad(dates, amounts)
+    else:
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        amounts = np.asarray(amounts, dtype=float)
+        mask = np.asarray(mask, dtype=bool)
+    if amounts.size == 0:
+        # No series, or series without flows: nothing to reduce over
+        return np.full(len(amounts), np.nan)
+    amounts = np.where(mask, amounts, 0.0)
+    first = np.where(mask, dates, np.datetime64("9999-12-31")).min(axis=1, keepdims=True)
+    times = np.where(mask, (dates - first).astype(float) / 365.0, 0.0)
+
+    valid = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+    low, high = bounds
+    rate = np.full(len(amounts), guess, dtype=float)  # an int guess would truncate every step
+    converged = ~valid
+    for _ in range(max_iter):
+        active = ~converged
+        if not active.any():
+            break
+        npv, slope = _npv(rate[active], times[active], amounts[active])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = npv / slope
+        stepped = np.clip(rate[active] - step, low, high)
+        done = np.isfinite(step) & (np.abs(step) < tol)
+        rate[active] = np.where(np.isfinite(stepped), stepped, rate[active])
+        converged[np.flatnonzero(active)[done]] = True
+
+    # Newton can stall on flat or multi-root NPV curves: bracket those on a grid and bisect
+    failed = valid & ~converged
+    if failed.any():
+        rows = np.flatnonzero(failed)
+        grid = np.concatenate([np.linspace(low, 0, 20, endpoint=False), np.geomspace(1e-4, high, 40)])
+        lo = np.full(len(rows), np.nan)
+        hi = np.full(len(rows), np.nan)
+        previous, previous_npv = None, None
+        for point in grid:
+            npv, _ = _npv(np.full(len(rows), point), times[rows], amounts[rows])
+            if previous is not None:
+                crossed = np.isnan(lo) & (np.sign(npv) != np.sign(previous_npv))
+                lo[crossed], hi[crossed] = previous, point
+            previous, previous_npv = point, npv
+        bracketed = ~np.isnan(lo)
+        rows, lo, hi = rows[bracketed], lo[bracketed], hi[bracketed]
+        f_lo, _ = _npv(lo, times[rows], amounts[rows])
+        for _ in range(200):
+            mid = (lo + hi) / 2
+            f_mid, _ = _npv(mid, times[rows], amounts[rows])
+            left = np.sign(f_mid) == np.sign(f_lo)
+            lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+            hi = np.where(left, hi, mid)
+            if np.all(hi - lo < tol):
+                break
+        rate[rows] = (lo + hi) / 2
+        converged[rows] = True
+
+    return np.where(valid & converged, rate, np.nan)
+
+@traced()
+def portfolio_xirr(transactions: pd.DataFrame, by: str = "user_id", terminal_values: pd.Series = None,
+                   as_of=None) -> pd.Series:
+    """
+    XIRR of every group (e.g. user portfolio) in a transactions table, in one batch.
+
+    ``transactions`` needs ``date`` and signed ``amount`` columns. The current
+    value of each portfolio, if given as ``terminal_values`` indexed by group,
+    is added as a final inflow dated ``as_of`` (today by default).
+    """
+    flows = transactions[[by, "date", "amount"]].copy()
+    flows["date"] = pd.to_datetime(flows["date"])
+    if terminal_values is not None:
+        as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today().normalize()
+        flows = pd.concat([flows, pd.DataFrame({
+            by: terminal_values.index,
+            "date": as_of,
+            "amount": terminal_values.to_numpy()
+        })], ignore_index=True)
+    flows = flows.sort_values([by, "date"], kind="stable")
+    groups, row = np.unique(flows[by].to_numpy(), return_inverse=True)
+    column = flows.groupby(by, sort=False).cumcount().to_numpy()
+    shape = (len(groups), column.max() + 1 if len(column) else 0)
+    dates = np.zeros(shape, dtype="datetime64[D]")
+    amounts = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    dates[row, column] = flows["date"].to_numpy().astype("datetime64[D]")
+    amounts[row, column] = flows["amount"].to_numpy()
+    mask[row, column] = True
+    return pd.Series(xirr_many(dates, amounts, mask), index=pd.Index(groups, name=by), name="xirr")
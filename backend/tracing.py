@@ -0,0 +1,311 @@
+"""
+Spans, metrics and an on-demand sampling profiler for the agents and tools.
+
+Wrap work in ``with span("name", key=value):`` or decorate it with
+``@traced("name")``. Every finished span updates in-process metrics
+(count, errors and a latency histogram per span name) and, when
+``FINAUTICA_TRACE_FILE`` names a file, is appended to it as one JSON line
+with its trace and parent ids. ``count`` adds to a labelled counter.
+``prometheus()`` renders all of it in the Prometheus text format and
+``serve_metrics`` exposes that on ``/metrics``.
+
+``profiling()`` samples every thread's stack while the block runs, so a
+single request can be profiled in production; the folded stacks are
+returned and written to the trace file.
+
+Set ``FINAUTICA_TRACE=0`` to turn spans into plain calls.
+"""
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar("finautica_span", default=None)
+# Ids are a per-process random prefix plus a counter: unique across processes, cheap to make
+_PREFIX = os.urandom(4).hex()
+_ids = itertools.count(1)
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "attributes")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.span_id = next(_ids)
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+class Tracer:
+    def __init__(self, path: str = None, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans: Dict[str, list] = {}  # name -> [count, errors, seconds, bucket counts]
+        self._counters: Dict[tuple, float] = defaultdict(float)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            yield Span(name, None, attributes)
+            return
+        current = Span(name, _current.get(), attributes)
+        token = _current.set(current)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield current
+        except BaseException as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _current.reset(token)
+            self._record(current, time.perf_counter() - started, error)
+
+    def _record(self, span: Span, seconds: float, error: Optional[str]):
+        with self._lock:
+            stats = self._spans.get(span.name)
+            if stats is None:
+                stats = self._spans[span.name] = [0, 0, 0.0, [0] * len(BUCKETS)]
+            stats[0] += 1
+            stats[1] += error is not None
+            stats[2] += seconds
+            bucket = bisect_left(BUCKETS, seconds)
+            if bucket < len(BUCKETS):
+                stats[3][bucket] += 1
+            if self.path:
+                self._write({
+                    "type": "span",
+                    "name": span.name,
+                    "trace_id": _format_id(span.trace_id),
+                    "span_id": _format_id(span.span_id),
+                    "parent_id": _format_id(span.parent_id),
+                    "start": span.start,
+                    "seconds": seconds,
+                    "error": error,
+                    "thread": threading.current_thread().name,
+                    "attributes": span.attributes
+                })
+
+    def _write(self, record: dict):
+        # Called with the lock held so lines from different threads never interleave
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, tuple(sorted((k, str(v)) for k, v in labels.items())))] += value
+
+    def snapshot(self) -> dict:
+        """Current metrics as plain data"""
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"count": count, "errors": errors, "seconds": seconds}
+                    for name, (count, errors, seconds, _) in self._spans.items()
+                },
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ]
+            }
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        def labels(pairs) -> str:
+            escaped = ",".join(
+                '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for k, v in pairs
+            )
+            return "{" + escaped + "}" if escaped else ""
+
+        lines = []
+        with self._lock:
+            spans = {name: (count, errors, seconds, list(buckets))
+                     for name, (count, errors, seconds, buckets) in self._spans.items()}
+            counters = dict(self._counters)
+        if spans:
+            lines += ["# HELP finautica_span_seconds Time spent in each traced operation",
+                      "# TYPE finautica_span_seconds histogram"]
+            for name, (count, _, seconds, buckets) in sorted(spans.items()):
+                cumulative = 0
+                for bound, hits in zip(BUCKETS, buckets):
+                    cumulative += hits
+                    lines.append(f"finautica_span_seconds_bucket{labels([('name', name), ('le', bound)])} {cumulative}")
+                lines.append(f"finautica_span_seconds_bucket{labels([('name', name), ('le', '+Inf')])} {count}")
+                lines.append(f"finautica_span_seconds_sum{labels([('name', name)])} {seconds}")
+                lines.append(f"finautica_span_seconds_count{labels([('name', name)])} {count}")
+            lines += ["# HELP finautica_span_errors_total Traced operations that raised",
+                      "# TYPE finautica_span_errors_total counter"]
+            for name, (_, errors, _, _) in sorted(spans.items()):
+                lines.append(f"finautica_span_errors_total{labels([('name', name)])} {errors}")
+        for metric in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE finautica_{metric}_total counter")
+            for (name, pairs), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f"finautica_{metric}_total{labels(pairs)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+def _format_id(value: Optional[int]) -> Optional[str]:
+    return None if value is None else f"{_PREFIX}{value:08x}"
+
+tracer = Tracer(
+    path=os.environ.get("FINAUTICA_TRACE_FILE") or None,
+    enabled=os.environ.get("FINAUTICA_TRACE", "1") != "0"
+)
+
+def span(name: str, **attributes):
+    return tracer.span(name, **attributes)
+
+def count(name: str, value: float = 1, **labels):
+    tracer.count(name, value, **labels)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def record_llm(current: Optional[Span], model: str, prompt: str, completion: str):
+    """Attach the sizes of one model call to ``current`` and the token counters"""
+    # The Ollama wrapper reports no usage, so tokens are estimated at four characters each
+    prompt_tokens, completion_tokens = -(-len(prompt) // 4), -(-len(completion) // 4)
+    count("llm_prompt_tokens", prompt_tokens, model=model)
+    count("llm_completion_tokens", completion_tokens, model=model)
+    if current is not None:
+        current.set(model=model, prompt_chars=len(prompt), completion_chars=len(completion),
+                    prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+def traced(name: str = None, size: Callable = None):
+    """
+    Run the decorated function inside a span (default name: module.qualname).
+
+    ``size(result)`` may return a number recorded as the span's ``size``.
+    """
+    def decorate(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            # Inlined rather than ``with tracer.span(...)``: this wraps hot tool calls
+            current = Span(label, _current.get(), {})
+            token = _current.set(current)
+            started = time.perf_counter()
+            error = None
+            try:
+                result = func(*args, **kwargs)
+                if size is not None:
+                    current.attributes["size"] = size(result)
+                return result
+            except BaseException as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                _current.reset(token)
+                tracer._record(current, time.perf_counter() - started, error)
+        return wrapper
+    return decorate
+
+def serve_metrics(port: int = 9464, host: str = "127.0.0.1"):
+    """Serve ``prometheus()`` on ``/metrics`` from a daemon thread"""
+    # Imported here: http.server alone doubles the import time of everything that traces
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+class SamplingProfiler:
+    """Samples every thread's Python stack each ``interval`` seconds into folded-stack counts"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self, limit: int = None) -> str:
+        """``flamegraph.pl`` / speedscope input: one ``stack count`` line per distinct stack"""
+        return "\n".join(f"{stack} {hits}" for stack, hits in self.stacks.most_common(limit))
+
+@contextmanager
+def profiling(interval: float = 0.005, limit: int = 200):
+    """Sample stacks for the duration of the block; the profile also goes to the trace file"""
+    profiler = SamplingProfiler(interval).start()
+    current = _current.get()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        if tracer.path:
+            with tracer._lock:
+                tracer._write({
+                    "type": "profile",
+                    "trace_id": _format_id(current.trace_id) if current else None,
+                    "span_id": _format_id(current.span_id) if current else None,
+                    "interval": interval,
+                    "samples": profiler.samples,
+                    "stacks": dict(profiler.stacks.most_common(limit))
+                })
@@ -0,0 +1,322 @@
+"""
+Performance baselines for the numeric tools, the database and the dashboard data prep.
+
+    python benchmarks/bench.py run --output baseline.json
+    python benchmarks/bench.py run --output current.json
+    python benchmarks/bench.py compare baseline.json current.json
+
+Every benchmark runs on generated data at several sizes and records wall
+time, peak traced memory and throughput. ``compare`` exits non-zero when a
+benchmark got slower or hungrier than the threshold allows.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "frontend", "streamlit_app"), os.path.dirname(os.path.abspath(__file__))]
+
+import numpy as np
+import pandas as pd
+
+import stubs
+from backend.data.database import FinancialDatabase
+from backend.data.sample_data import generate_transactions
+
+BUDGET = {
+    "Groceries": 15000,
+    "Dining": 8000,
+    "Transport": 12000,
+    "Housing": 60000,
+    "Utilities": 18000,
+    "Entertainment": 10000
+}
+BENCHMARKS = {}
+
+def benchmark(name):
+    """
+    Register ``setup(size) -> run``; ``run()`` does the timed work and returns the items processed.
+
+    ``setup`` may instead return ``(prepare, run)``: ``prepare()`` runs untimed
+    before every repetition and its result is passed to ``run``.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def transactions(size: int) -> pd.DataFrame:
+    return pd.concat(generate_transactions(size, num_users=max(1, size // 1000), seed=0), ignore_index=True)
+
+def temp_database(size: int = 0) -> FinancialDatabase:
+    directory = tempfile.mkdtemp(prefix="finautica-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    db = FinancialDatabase(os.path.join(directory, "bench.db"))
+    if size:
+        db.add_transactions(transactions(size))
+    return db
+
+@benchmark("goal_simulator.simulate")
+def _goal_simulate(size):
+    from backend.tools.goals_stimulator import GoalSimulator
+    simulator = GoalSimulator(seed=0)
+
+    def run():
+        simulator.simulate(2_000_000, 10_000, 20, 0.1, n_paths=size)
+        return size
+    return run
+
+@benchmark("sip_calculator.project")
+def _sip_project(size):
+    from backend.tools.sip_calculator import SIPCalculator
+    calculator = SIPCalculator()
+    mix = {"equity": 0.6, "debt": 0.3, "hybrid": 0.1}
+    calls = min(size, 10_000)
+
+    def run():
+        for i in range(calls):
+            calculator.project(1000 + i, 10, mix)
+        return calls
+    return run
+
+@benchmark("sip_calculator.project_grid")
+def _sip_grid(size):
+    from backend.tools.sip_calculator import SIPCalculator
+    calculator = SIPCalculator()
+    amounts = np.linspace(1000, 100_000, max(1, size // 100))
+    return lambda: len(calculator.project_grid(amounts, range(1, 11), rates=np.linspace(0.04, 0.16, 10)))
+
+@benchmark("executor.calculate_sip")
+def _calculate_sip(size):
+    stubs.install()
+    from backend.agents.executor_agent import calculate_sip
+    calls = min(size, 10_000)
+
+    def run():
+        for i in range(calls):
+            calculate_sip.invoke({"principal": 1000 + i, "years": 10, "rate": 12})
+        return calls
+    return run
+
+@benchmark("budget_analyzer.analyze")
+def _budget_analyze(size):
+    from backend.tools.budget_analyzer import BudgetAnalyzer
+    frame = transactions(size)
+
+    def run():
+        BudgetAnalyzer().analyze(frame, BUDGET)
+        return len(frame)
+    return run
+
+@benchmark("risk_assessor")
+def _risk(size):
+    from backend.tools.risk_assessment import RiskAssessor, RiskProfile
+    assessor = RiskAssessor()
+    profile = RiskProfile(volatility=0.5, liquidity_needs=0.4, concentration=0.5, time_horizon=0.7, loss_capacity=0.4)
+    holdings = {f"fund_{i}": float(i + 1) for i in range(20)}
+    calls = min(size, 10_000)
+
+    def run():
+        for _ in range(calls):
+            assessor.calculate_risk_score(profile)
+            assessor.portfolio_risk_analysis(holdings)
+        return calls
+    return run
+
+@benchmark("database.add_transaction")
+def _db_insert_one(size):
+    # Each insert commits (and fsyncs) on its own, so keep the row count modest
+    rows = transactions(min(size, 200)).to_dict("records")
+
+    def run(db):
+        for row in rows:
+            db.add_transaction(row)
+        return len(rows)
+    # A fresh, untimed database every repetition, so repeats don't insert into an ever larger table;
+    # it is closed when the next repetition drops it, outside the timed region
+    return temp_database, run
+
+@benchmark("database.add_transactions")
+def _db_insert_bulk(size):
+    frame = transactions(size)
+
+    def run(db):
+        return db.add_transactions(frame)["rows"]
+    return temp_database, run
+
+@benchmark("database.get_transactions_month")
+def _db_query_month(size):
+    db = temp_database(size)
+    months = [row["month"] for row in db.get_monthly_summary()]
+    month = months[len(months) // 2]
+    return lambda: len(db.get_transactions(month=month))
+
+@benchmark("database.iter_transaction_frames")
+def _db_frames(size):
+    db = temp_database(size)
+    return lambda: sum(len(frame) for frame in db.iter_transaction_frames())
+
+@benchmark("dashboard.cashflow_daily_totals")
+def _cashflow_prep(size):
+    from dashboard import cashflow_daily_totals
+    frame = transactions(size)
+
+    def run():
+        cashflow_daily_totals(frame)
+        return len(frame)
+    return run
+
+@benchmark("dashboard.budget_category_totals")
+def _budget_prep(size):
+    from dashboard import budget_category_totals
+    frame = transactions(size)
+
+    def run():
+        budget_category_totals(frame, BUDGET)
+        return len(frame)
+    return run
+
+@benchmark("batch_runner.run")
+def _batch_runner(size):
+    # Real Ollama clients against a local stub server that takes 10 ms per request
+    from backend.agents import batch_runner
+    from backend.agents.llm_cache import LLMCache
+    from backend.agents.registry import registry
+    # Earlier benchmarks may have stubbed the Ollama class and built agents on it
+    stubs.uninstall()
+    registry.reset()
+    server = stubs.serve_ollama(delay=0.01)
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    directory = tempfile.mkdtemp(prefix="finautica-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    registry.register("llm_cache", lambda: LLMCache(os.path.join(directory, "llm_cache.sqlite")))
+    # Memories are dropped: this measures the models, not the vector store
+    registry.register("user_memory", lambda: SimpleNamespace(remember=lambda *args, **kwargs: True))
+    users = min(size, 1000)
+
+    def run():
+        registry.get("llm_cache").clear()
+        states = [{"goals": ["retire"], "profile": {"user_id": str(i)}, "plan": {}, "results": {}, "insights": {}}
+                  for i in range(users)]
+        results = batch_runner.run_batch(states, concurrency={model: 8 for model in ("mistral", "llama3", "mixtral")})
+        return len(results)
+    return run
+
+@benchmark("import.agent_workflow")
+def _import_workflow(size):
+    # A fresh interpreter each time: the cost being measured is a cold start
+    import subprocess
+    command = [sys.executable, "-c", "import backend.agents.agent_workflow"]
+
+    def run():
+        subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+        return 1
+    return run
+
+def measure(setup, size: int, repeat: int) -> dict:
+    prepared = setup(size)
+    prepare, timed = prepared if isinstance(prepared, tuple) else (None, prepared)
+    timings = []
+    for _ in range(repeat):
+        args = () if prepare is None else (prepare(),)
+        started = time.perf_counter()
+        items = timed(*args)
+        timings.append(time.perf_counter() - started)
+    # Peak memory on a separate pass: tracing slows the code down too much to time it
+    args = () if prepare is None else (prepare(),)
+    tracemalloc.start()
+    timed(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "items": items,
+        "throughput": items / seconds if seconds > 0 else None
+    }
+
+def run_suite(args) -> int:
+    results = []
+    for name, setup in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        for size in args.sizes:
+            entry = {"name": name, "size": size}
+            try:
+                entry.update(measure(setup, size, args.repeat), status="ok")
+            except ImportError as error:
+                entry.update(status="skipped", reason=str(error))
+            except Exception as error:
+                entry.update(status="failed", reason=f"{type(error).__name__}: {error}")
+            print(f"{name:36} {size:>9} {entry['status']:>8} "
+                  + (f"{entry['seconds'] * 1000:10.2f} ms {entry['peak_bytes'] / 2**20:8.1f} MiB"
+                     if entry["status"] == "ok" else entry["reason"]))
+            results.append(entry)
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"] if r["status"] == "ok"}
+    with open(args.current) as f:
+        current = [r for r in json.load(f)["results"] if r["status"] == "ok"]
+    regressions = 0
+    for result in current:
+        before = baseline.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        time_ratio = result["seconds"] / before["seconds"]
+        memory_ratio = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        flags = []
+        if time_ratio > 1 + args.threshold:
+            flags.append("SLOWER")
+        if memory_ratio > 1 + args.threshold:
+            flags.append("MORE MEMORY")
+        regressions += bool(flags)
+        print(f"{result['name']:36} {result['size']:>9} time x{time_ratio:6.2f} "
+              f"memory x{memory_ratio:6.2f} {' '.join(flags)}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks and write a JSON report")
+    run.add_argument("--output", default="bench_results.json")
+    run.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--filter", help="only run benchmarks whose name contains this")
+    run.set_defaults(handler=run_suite)
+    diff = commands.add_parser("compare", help="flag regressions against a saved baseline")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    diff.set_defaults(handler=compare)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
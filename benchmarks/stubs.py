@@ -0,0 +1,114 @@
+"""
+Local stand-ins for the LLM, embedding model and vector store.
+
+``install()`` swaps them into the langchain modules the agents import from,
+so benchmarks never reach Ollama, download a model or write ./chroma_db;
+``uninstall()`` puts the real classes back.
+"""
+import hashlib
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import numpy as np
+
+class StubEmbeddings:
+    """Deterministic pseudo-embeddings derived from a hash of the text"""
+
+    def __init__(self, *args, dim: int = 384, **kwargs):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+class StubVectorStore:
+    """In-memory vector store with the parts of the Chroma API the app uses"""
+
+    def __init__(self, *args, embedding_function=None, **kwargs):
+        self.embeddings = embedding_function or StubEmbeddings()
+        self.texts, self.metadatas, self.vectors = [], [], []
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas or [{}] * len(texts))
+        self.vectors.extend(self.embeddings.embed_documents(texts))
+        return [str(i) for i in range(len(self.texts) - len(texts), len(self.texts))]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        if not self.vectors:
+            return []
+        scores = np.asarray(self.vectors) @ np.asarray(self.embeddings.embed_query(query))
+        return [self.texts[i] for i in np.argsort(-scores)[:k]]
+
+def _stub_llm():
+    try:
+        from langchain_core.language_models.fake import FakeListLLM
+    except ImportError:
+        from langchain_community.llms.fake import FakeListLLM
+
+    class StubLLM(FakeListLLM):
+        """Answers every prompt with a fixed JSON document"""
+
+        def __init__(self, *args, model: str = "stub", **kwargs):
+            super().__init__(responses=['{"short_term_goals": [], "long_term_goals": [], "allocation": {}}'])
+
+    return StubLLM
+
+def serve_ollama(port: int = 0, delay: float = 0.0, response: str = None) -> ThreadingHTTPServer:
+    """
+    Serve a minimal Ollama ``/api/generate`` endpoint on localhost in a daemon thread.
+
+    Every request sleeps ``delay`` seconds, standing in for inference, then
+    streams back ``response``. Point the agents at it with
+    ``OLLAMA_BASE_URL=http://127.0.0.1:<server.server_port>``.
+    """
+    body = response or '{"short_term_goals": [], "long_term_goals": [], "allocation": {}}'
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            self.wfile.write(json.dumps({"model": request.get("model"), "response": body, "done": False}).encode() + b"\n")
+            self.wfile.write(json.dumps({"model": request.get("model"), "response": "", "done": True}).encode() + b"\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+_originals = {}
+
+def install():
+    """Patch the LLM, embedding and vector store classes; skips any langchain package that is not installed"""
+    patches = [
+        ("langchain_community.embeddings", "HuggingFaceEmbeddings", lambda: StubEmbeddings),
+        ("langchain_community.vectorstores", "Chroma", lambda: StubVectorStore),
+        ("langchain_community.llms", "Ollama", _stub_llm),
+    ]
+    for module_name, attribute, stub in patches:
+        try:
+            module = importlib.import_module(module_name)
+            # Kept from the first install only, so installing twice still restores the real class
+            _originals.setdefault((module_name, attribute), getattr(module, attribute))
+            setattr(module, attribute, stub())
+        except ImportError:
+            continue
+
+def uninstall():
+    """Restore the classes ``install`` replaced"""
+    while _originals:
+        (module_name, attribute), original = _originals.popitem()
+        setattr(importlib.import_module(module_name), attribute, original)
@@ -98,9 +98,9 @@ def financial_health_meter(score: float) -> Any:
     )
     return fig
 
-def cashflow_calendar_heatmap(transactions: pd.DataFrame) -> Any:
+def cashflow_daily_totals(transactions: pd.DataFrame) -> pd.DataFrame:
     """
-    Create an interactive calendar heatmap of cashflow
+    Daily spend totals keyed by month, ISO week and weekday
     """
     transactions = transactions.copy()
     transactions['date'] = pd.to_datetime(transactions['date'])
@@ -116,9 +116,15 @@ def cashflow_calendar_heatmap(transactions: pd.DataFrame) -> Any:
         ordered=True
     )
     
-    daily_totals = transactions.groupby(
+    return transactions.groupby(
         ['month', 'week', 'day', 'date']
     )['amount'].sum().reset_index()
+
+def cashflow_calendar_heatmap(transactions: pd.DataFrame) -> Any:
+    """
+    Create an interactive calendar heatmap of cashflow
+    """
+    daily_totals = cashflow_daily_totals(transactions)
     
     fig = px.density_heatmap(
         daily_totals,
@@ -140,9 +146,9 @@ def cashflow_calendar_heatmap(transactions: pd.DataFrame) -> Any:
     
     return fig
 
-def budget_sunburst(transactions: pd.DataFrame, budget: Dict[str, float]) -> Any:
+def budget_category_totals(transactions: pd.DataFrame, budget: Dict[str, float]) -> pd.DataFrame:
     """
-    Create an interactive sunburst chart of budget vs actual
+    Spend per category with its over/under status and variance against budget
     """
     category_totals = transactions.groupby('category')['amount'].sum().reset_index()
     category_totals['status'] = category_totals.apply(
@@ -155,6 +161,13 @@ def budget_sunburst(transactions: pd.DataFrame, budget: Dict[str, float]) -> Any
         lambda x: (x['amount'] - budget.get(x['category'], 0)) / budget.get(x['category'], 1) * 100,
         axis=1
     )
+    return category_totals
+
+def budget_sunburst(transactions: pd.DataFrame, budget: Dict[str, float]) -> Any:
+    """
+    Create an interactive sunburst chart of budget vs actual
+    """
+    category_totals = budget_category_totals(transactions, budget)
     
     fig = px.sunburst(
         category_totals,
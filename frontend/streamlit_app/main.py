@@ -6,7 +6,10 @@ from dashboard import (
     budget_sunburst
 )
 from backend.tools.risk_assessment import RiskAssessor, RiskProfile
+from backend.data.database import FinancialDatabase
+from backend.data.snapshot import TransactionSnapshot
 import pandas as pd
+import threading
 from datetime import datetime
 
 # Page config
@@ -36,9 +39,32 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# One pooled database shared by every session and rerun
+@st.cache_resource
+def get_database():
+    return FinancialDatabase(pool=True)
+
+SNAPSHOT_PATH = "backend/data/snapshot"
+MAX_SNAPSHOT_SEGMENTS = 8  # merged back into one beyond this, so reads stay (mostly) zero-copy
+
+# Serialises snapshot refreshes across sessions: they share the manifest and segment numbering
+@st.cache_resource
+def get_snapshot_lock():
+    return threading.Lock()
+
 # Sample data loader
-@st.cache_data
+@st.cache_resource(ttl=60)
 def load_sample_data():
+    # Bring the columnar snapshot up to date with the database, then memory-map it.
+    # st.cache_resource rather than st.cache_data: pickling the frame would copy the mapped
+    # columns. The frame is shared by every session, so it must be treated as read-only.
+    with get_snapshot_lock():
+        snapshot = TransactionSnapshot(SNAPSHOT_PATH)
+        snapshot.append_from_db(get_database())
+        if len(snapshot.manifest["segments"]) > MAX_SNAPSHOT_SEGMENTS:
+            snapshot.compact()
+        if snapshot.rows:
+            return snapshot.to_frame()
     return pd.read_csv("backend/data/sample_data/transactions.csv")
 
 # Initialize risk assessor
@@ -0,0 +1,42 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from backend.tools.anomaly_detector import SpendAnomalyDetector
+
+def _stationary(days: int, seed: int = 0):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        # Weekends run 20% higher than weekdays, with no trend
+        typical = 300.0 if day.weekday() >= 5 else 250.0
+        yield {"amount": rng.gauss(typical, 20.0), "date": day.isoformat(), "category": "food"}
+
+def test_state_is_stable_on_a_stationary_stream():
+    detector = SpendAnomalyDetector()
+    levels = []
+    for i, transaction in enumerate(_stationary(3000)):
+        detector.observe(transaction)
+        if i >= 500 and i % 100 == 0:
+            levels.append(detector.categories["food"]["mean"])
+    stats = detector.categories["food"]
+
+    assert sum(stats["weekday"]) / 7 == pytest.approx(1.0)
+    assert 230 < min(levels) and max(levels) < 300
+    assert all(0.8 < factor < 1.3 for factor in stats["weekday"])
+    assert stats["weekday"][5] > stats["weekday"][0]
+
+def test_stationary_stream_raises_few_anomalies():
+    detector = SpendAnomalyDetector(history=10000)
+    for transaction in _stationary(3000, seed=1):
+        detector.observe(transaction)
+    assert len(detector.anomalies) < 3000 * 0.02
+
+def test_spike_is_flagged():
+    detector = SpendAnomalyDetector()
+    for transaction in _stationary(200):
+        detector.observe(transaction)
+    anomaly = detector.observe({"amount": 5000.0, "date": "2024-07-19", "category": "food"})
+    assert anomaly is not None and anomaly["score"] > detector.threshold
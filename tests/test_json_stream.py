@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from backend.agents import planner_agent
+from backend.agents.json_stream import SectionParser, parse_value, repair_json
+from backend.agents.llm_cache import LLMCache
+from backend.agents.registry import registry
+
+PLAN = {"short_term_goals": [{"goal": "car"}], "long_term_goals": [], "allocation": {"equity": 60, "debt": 40}}
+
+def feed_all(parser: SectionParser, text: str, size: int = 3):
+    return [member for start in range(0, len(text), size) for member in parser.feed(text[start:start + size])]
+
+def test_members_close_as_they_stream():
+    parser = SectionParser()
+    members = feed_all(parser, "Here is your plan:\n" + json.dumps(PLAN) + "\nGood luck!")
+    assert [key for key, _ in members] == list(PLAN)
+    assert {key: json.loads(raw) for key, raw in members} == PLAN
+    assert parser.done and parser.finish() == []
+
+def test_scalar_and_string_members():
+    parser = SectionParser()
+    members = feed_all(parser, '{"note": "a, {b} \\"c\\"", "count": 3, "flag": true}')
+    assert members == [("note", '"a, {b} \\"c\\""'), ("count", "3"), ("flag", "true")]
+
+def test_truncated_member_is_reported_not_closed():
+    parser = SectionParser()
+    members = feed_all(parser, '{"long_term_goals": [], "allocation": {"equity": 60, "debt": 4')
+    assert members == [("long_term_goals", "[]")]
+    assert not parser.done
+    assert parser.finish() == [("allocation", '{"equity": 60, "debt": 4')]
+
+@pytest.mark.parametrize("raw, expected", [
+    ("{'a': 'it\\'s', 'b': True, 'c': None,}", {"a": "it's", "b": True, "c": None}),
+    ('```json\n[1, 2, 3,]\n```', [1, 2, 3]),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+])
+def test_repair(raw, expected):
+    assert parse_value(raw) == expected
+
+@pytest.mark.parametrize("raw", ['{"a": é}', '{"a": ünknown}', "{'a': maybe}"])
+def test_bare_words_raise_decode_errors(raw):
+    with pytest.raises(json.JSONDecodeError):
+        parse_value(raw)
+
+def test_repair_keeps_non_ascii_strings():
+    assert json.loads(repair_json("{'city': 'Zürich'}")) == {"city": "Zürich"}
+
+class FakeChain:
+    def __init__(self, chunks=(), response=None):
+        self.chunks, self.response, self.calls = list(chunks), response, []
+
+    def stream(self, payload):
+        self.calls.append(payload)
+        return iter(self.chunks)
+
+    def invoke(self, payload):
+        self.calls.append(payload)
+        return self.response
+
+@pytest.fixture
+def components(tmp_path):
+    names = ("planner", "section_planner", "llm_cache")
+    saved = {name: registry._factories.get(name) for name in names}
+    yield lambda name, instance: registry.register(name, lambda: instance)
+    for name, factory in saved.items():
+        registry.register(name, factory)
+
+def test_stream_plan_re_requests_a_truncated_section(components, tmp_path):
+    text = json.dumps(PLAN)
+    text = text[:text.index('"debt": 40') + len('"debt": 4')]
+    planner = FakeChain([text[i:i + 7] for i in range(0, len(text), 7)])
+    section_planner = FakeChain(response='{"equity": 60, "debt": 40}')
+    components("planner", planner)
+    components("section_planner", section_planner)
+    components("llm_cache", LLMCache(str(tmp_path / "cache.sqlite")))
+
+    plan = planner_agent.generate_plan({"goals": [], "profile": {"user_id": "u1"}}, on_section=lambda *_: None)
+
+    assert plan == PLAN
+    assert [call["section"] for call in section_planner.calls] == ["allocation"]
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.tools.xirr import portfolio_xirr, xirr_many
+
+# 100 invested on 2023-01-01 and 110 back a year (365 days) later: 10% a year
+DATES = [["2023-01-01", "2024-01-01"]]
+AMOUNTS = [[-100.0, 110.0]]
+
+@pytest.mark.parametrize("guess", [0, 1, 0.1, -0.5])
+def test_known_answer_for_any_guess(guess):
+    assert xirr_many(DATES, [[-100, 110]], guess=guess) == pytest.approx([0.1], abs=1e-9)
+
+def test_two_year_doubling():
+    rate = xirr_many([["2020-01-01", "2021-12-31"]], [[-1000.0, 2000.0]])[0]
+    assert (1 + rate) ** (730 / 365) == pytest.approx(2.0)
+
+def test_series_without_both_signs_are_nan():
+    rates = xirr_many([["2023-01-01", "2024-01-01"], ["2023-01-01"]], [[-100.0, -5.0], [50.0]])
+    assert np.isnan(rates).all()
+
+def test_empty_inputs():
+    assert xirr_many([], []).shape == (0,)
+    assert np.isnan(xirr_many([[], []], [[], []])).all()
+    assert portfolio_xirr(pd.DataFrame(columns=["user_id", "date", "amount"])).empty
+
+def test_portfolio_xirr_with_terminal_values():
+    flows = pd.DataFrame({"user_id": ["a", "b"], "date": ["2023-01-01", "2023-01-01"], "amount": [-100.0, -100.0]})
+    terminal = pd.Series({"a": 110.0, "b": 90.0})
+    rates = portfolio_xirr(flows, terminal_values=terminal, as_of="2024-01-01")
+    assert rates["a"] == pytest.approx(0.1)
+    assert rates["b"] == pytest.approx(-0.1)